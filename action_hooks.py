@@ -0,0 +1,159 @@
+import importlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import metrics
+from ca_extractor import chain_of
+
+load_dotenv()
+MONGO_URL = os.getenv('MONGO_URL')
+mongo_client = MongoClient(MONGO_URL)
+db_name = os.getenv('DATABASE_NAME')
+db = mongo_client[db_name]
+config_collection = db['configs']
+
+ACTION_HOOK_WORKERS = int(os.getenv("ACTION_HOOK_WORKERS", 2))
+
+
+class ContractEvent:
+    """What an action hook gets when a CA is found."""
+
+    __slots__ = ("address", "chain", "source", "posted_at", "detected_at", "detected_monotonic")
+
+    def __init__(self, address, source=None, posted_at=None):
+        self.address = address
+        self.chain = chain_of(address)
+        # "tweet:<id>" or "telegram:<message id>"
+        self.source = source
+        # Unix time the post was published, when known
+        self.posted_at = posted_at
+        self.detected_at = time.time()
+        self.detected_monotonic = time.monotonic()
+
+    def as_dict(self):
+        return {
+            "address": self.address,
+            "chain": self.chain,
+            "source": self.source,
+            "posted_at": self.posted_at,
+            "detected_at": self.detected_at,
+        }
+
+
+def load_hook(spec):
+    """Resolve "module:attribute" to a callable.
+
+    Classes are instantiated with the optional `options` of a dict spec,
+    anything with an `on_contract` method is used through it.
+    """
+    options = {}
+    if isinstance(spec, dict):
+        options = spec.get("options", {})
+        spec = spec["hook"]
+    module_name, _, attribute = spec.partition(":")
+    hook = getattr(importlib.import_module(module_name), attribute or "on_contract")
+    if isinstance(hook, type):
+        hook = hook(**options)
+    return getattr(hook, "on_contract", hook)
+
+
+class ActionHooks:
+    """Runs in-process action hooks (e.g. auto-buy) for every new CA.
+
+    emit() is called right where a CA is found and only submits work;
+    the hooks themselves run on a dedicated thread pool so a slow plugin
+    can't stall polling or message handling.
+    """
+
+    def __init__(self, workers=ACTION_HOOK_WORKERS):
+        self.hooks = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="action-hook")
+
+    def load(self, specs):
+        hooks = []
+        for spec in specs:
+            try:
+                hooks.append((str(spec.get("hook") if isinstance(spec, dict) else spec), load_hook(spec)))
+            except Exception as e:
+                logging.error(f"Failed to load action hook {spec}: {e}")
+        self.hooks = hooks
+        logging.info(f"Loaded {len(hooks)} action hook(s)")
+        return len(hooks)
+
+    def load_from_config(self):
+        config = config_collection.find_one() or {}
+        return self.load(config.get("action_hooks", []))
+
+    def emit(self, address, source=None, posted_at=None):
+        if not self.hooks:
+            return None
+        event = ContractEvent(address, source, posted_at)
+        for name, hook in self.hooks:
+            self._executor.submit(self._run, name, hook, event)
+        return event
+
+    def _run(self, name, hook, event):
+        try:
+            hook(event)
+        except Exception as e:
+            logging.error(f"Action hook {name} failed for {event.address}: {e}")
+            metrics.incr("action_hook_errors")
+            return
+        metrics.observe("action_hook_latency", time.monotonic() - event.detected_monotonic)
+
+
+action_hooks = ActionHooks()
+
+
+if __name__ == "__main__":
+    # Hook latency benchmark, one event at a time: python action_hooks.py [events]
+    import sys
+    import tempfile
+    import threading
+
+    import pipe_hook
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    address = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+
+    def bench(label, hook):
+        done = threading.Semaphore(0)
+
+        def timed_hook(event):
+            hook(event)
+            done.release()
+
+        hooks = ActionHooks()
+        hooks.hooks = [(label, timed_hook)]
+        with metrics._lock:
+            metrics._samples.pop("action_hook_latency", None)
+        emit_seconds = 0.0
+        for _ in range(total):
+            started = time.perf_counter()
+            hooks.emit(address, source="tweet:1")
+            emit_seconds += time.perf_counter() - started
+            done.acquire()
+        time.sleep(0.05)
+        samples = sorted(metrics.snapshot()["samples"]["action_hook_latency"])
+        print(f"{label}: emit {emit_seconds / total * 1e6:.1f}us, detect->hook done "
+              f"p50 {samples[len(samples) // 2] * 1e6:.0f}us, p99 {samples[int(len(samples) * 0.99)] * 1e6:.0f}us")
+
+    bench("no-op hook", lambda event: None)
+
+    # Named pipe hook with a reader draining the other end
+    path = os.path.join(tempfile.mkdtemp(), "ca.fifo")
+    os.mkfifo(path)
+    received = []
+
+    def reader():
+        with open(path) as fifo:
+            received.extend(fifo)
+
+    threading.Thread(target=reader, daemon=True).start()
+    time.sleep(0.1)
+    bench("named pipe hook", pipe_hook.NamedPipeHook(path).on_contract)
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+import metrics
+from known_addresses import normalize
+
+load_dotenv()
+
+# Seconds during which the same contract address is alerted only once
+ALERT_DEDUP_WINDOW = float(os.getenv("ALERT_DEDUP_WINDOW", 3600))
+ALERT_DEDUP_MAX_ENTRIES = int(os.getenv("ALERT_DEDUP_MAX_ENTRIES", 4096))
+
+
+class AlertDeduplicator:
+    """Bounded TTL set of recently alerted addresses.
+
+    Shared by the Twitter and Telegram platforms so a CA posted in both the
+    text and an image, or in several posts in a row, only alerts once per
+    window. Entries are kept in expiry order, so expired ones are dropped
+    from the front on every call.
+    """
+
+    def __init__(self, window=ALERT_DEDUP_WINDOW, max_entries=ALERT_DEDUP_MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self._expires = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        while self._expires:
+            address, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            self._expires.popitem(last=False)
+
+    def first_seen(self, address):
+        """True the first time `address` shows up in the window, False for repeats."""
+        key = normalize(address)
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            if key in self._expires:
+                metrics.incr("alerts_suppressed_duplicate")
+                return False
+            self._expires[key] = now + self.window
+            while len(self._expires) > self.max_entries:
+                self._expires.popitem(last=False)
+        return True
+
+    def fresh(self, addresses):
+        """Addresses not alerted within the window, marking them as alerted."""
+        return [address for address in addresses if self.first_seen(address)]
+
+    def first_fresh(self, addresses):
+        """The first address not alerted within the window, as a list of at most one.
+
+        Only that address is marked, the others stay free to alert later.
+        """
+        for address in addresses:
+            if self.first_seen(address):
+                return [address]
+        return []
+
+    def clear(self):
+        with self._lock:
+            self._expires.clear()
+
+
+alert_dedup = AlertDeduplicator()
@@ -0,0 +1,190 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+# Overridable so a local fake Bot API server can be used in tests
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+ALERT_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+ALERT_RETRIES = 3
+# Telegram allows about one message per second to the same chat
+ALERT_CHAT_INTERVAL = float(os.getenv("ALERT_CHAT_INTERVAL", 1.0))
+# Longest Telegram retry_after we are willing to honour before dropping an alert
+ALERT_MAX_RETRY_AFTER = 60
+
+
+class AlertDispatcher:
+    """Delivers alerts to the Bot API off the hunt's event loop.
+
+    send() only enqueues and returns immediately, from any thread or loop.
+    A background thread runs its own event loop with one sender task per
+    chat, so a rate limited chat never holds up the others. Messages go
+    over a single pooled HTTP connection.
+    """
+
+    def __init__(self, token, api_url=TELEGRAM_API_URL, chat_interval=ALERT_CHAT_INTERVAL,
+                 retries=ALERT_RETRIES):
+        self.token = token
+        self.api_url = api_url.rstrip("/")
+        self.chat_interval = chat_interval
+        self.retries = retries
+        self.loop = None
+        self.thread = None
+        self._queues = {}
+        self._next_send = {}
+        self._http_client = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(self.loop)
+                self._http_client = httpx.AsyncClient(
+                    timeout=ALERT_TIMEOUT,
+                    limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=300),
+                )
+                self.loop.call_soon(ready.set)
+                self.loop.run_forever()
+
+            self.thread = threading.Thread(target=run_loop, name="alert-dispatcher", daemon=True)
+            self.thread.start()
+            ready.wait()
+
+    def send(self, chat_id, text):
+        """Queue `text` for `chat_id` without waiting for delivery.
+
+        Returns a concurrent.futures.Future resolving to whether the alert
+        was delivered, for callers that do want to know.
+        """
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self._enqueue, chat_id, text, time.monotonic(), future)
+        metrics.incr("alerts_queued")
+        return future
+
+    def _enqueue(self, chat_id, text, enqueued_at, future):
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+            self.loop.create_task(self._sender(chat_id, queue))
+        queue.put_nowait((text, enqueued_at, future))
+
+    async def _sender(self, chat_id, queue):
+        while True:
+            text, enqueued_at, future = await queue.get()
+            # Still delivered if the caller stopped waiting, the result is just not reported
+            waiting = future.set_running_or_notify_cancel()
+            wait = self._next_send.get(chat_id, 0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                delivered = await self._deliver(chat_id, text)
+            except Exception as e:
+                logging.error(f"Unexpected error delivering alert to {chat_id}: {e}")
+                delivered = False
+            self._next_send[chat_id] = time.monotonic() + self.chat_interval
+            if delivered:
+                metrics.incr("alerts_delivered")
+                metrics.observe("alert_delivery_latency", time.monotonic() - enqueued_at)
+            else:
+                metrics.incr("alerts_failed")
+            if waiting:
+                future.set_result(delivered)
+
+    async def _deliver(self, chat_id, text):
+        url = f"{self.api_url}/bot{self.token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text}
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._http_client.post(url, json=payload)
+            except httpx.TransportError as e:
+                logging.error(f"Alert delivery to {chat_id} failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                if retry_after > ALERT_MAX_RETRY_AFTER:
+                    logging.error(f"Telegram asked to wait {retry_after}s for {chat_id}, dropping alert")
+                    return False
+                logging.warning(f"Telegram rate limited chat {chat_id}, retrying in {retry_after}s")
+                metrics.incr("alerts_rate_limited")
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                logging.error(f"Bot API error {response.status_code} for {chat_id} (attempt {attempt + 1})")
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            if response.status_code != 200:
+                logging.error(f"Bot API rejected alert for {chat_id}: {response.status_code} {response.text[:200]}")
+                return False
+            return True
+        return False
+
+
+alert_dispatcher = AlertDispatcher(os.environ.get("TelegramBotToken"))
+
+
+if __name__ == "__main__":
+    # Run against a local fake Bot API: python alert_dispatcher.py [alerts]
+    import json
+    import sys
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    calls = []
+
+    class FakeBotAPI(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append(body)
+            # Rate limit the very first call to exercise retry_after
+            if len(calls) == 1:
+                status, reply = 429, {"ok": False, "parameters": {"retry_after": 1}}
+            else:
+                status, reply = 200, {"ok": True, "result": {}}
+            data = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    dispatcher = AlertDispatcher("TEST", api_url=f"http://127.0.0.1:{server.server_port}", chat_interval=0.05)
+    dispatcher._ensure_started()
+    started = time.perf_counter()
+    for i in range(total):
+        dispatcher.send(1000 + i % 2, f"alert {i}")
+    enqueue_ms = (time.perf_counter() - started) * 1000
+    while metrics.count("alerts_delivered") + metrics.count("alerts_failed") < total:
+        time.sleep(0.05)
+    server.shutdown()
+
+    print(f"{total} alerts enqueued in {enqueue_ms:.2f}ms total")
+    print(f"delivered {metrics.count('alerts_delivered')}, failed {metrics.count('alerts_failed')}, "
+          f"rate limited {metrics.count('alerts_rate_limited')}, API calls {len(calls)}")
+    print(f"enqueue->delivered p50 {metrics.percentile('alert_delivery_latency', 50) * 1000:.0f}ms, "
+          f"p95 {metrics.percentile('alert_delivery_latency', 95) * 1000:.0f}ms")
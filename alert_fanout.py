@@ -0,0 +1,172 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+import httpx
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import metrics
+from alert_dispatcher import alert_dispatcher
+from send_message import send_message_to_bot_async
+
+load_dotenv()
+MONGO_URL = os.getenv('MONGO_URL')
+mongo_client = MongoClient(MONGO_URL)
+db_name = os.getenv('DATABASE_NAME')
+db = mongo_client[db_name]
+config_collection = db['configs']
+
+# Seconds each kind of sink gets before the alert counts as timed out,
+# overridable per sink with the `sink_timeouts` config
+SINK_TIMEOUTS = {
+    "admin": 15.0,
+    "trading_bot": 10.0,
+    "webhook": 2.0,
+    "socket": 1.0,
+}
+
+
+class AlertSink:
+    """One destination for CA alerts."""
+
+    name = "sink"
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout if timeout is not None else SINK_TIMEOUTS.get(self.name, 5.0)
+
+    async def send(self, alert):
+        raise NotImplementedError
+
+
+class AdminChatSink(AlertSink):
+    """A Telegram chat, through the background Bot API dispatcher."""
+
+    name = "admin"
+
+    def __init__(self, chat_id, timeout=None):
+        super().__init__(timeout)
+        self.chat_id = chat_id
+
+    async def send(self, alert):
+        return await asyncio.wrap_future(alert_dispatcher.send(self.chat_id, alert["address"]))
+
+
+class TradingBotSink(AlertSink):
+    """The configured `bot` username, messaged from the Telethon account."""
+
+    name = "trading_bot"
+
+    async def send(self, alert):
+        await send_message_to_bot_async(alert["address"])
+        return True
+
+
+class WebhookSink(AlertSink):
+    """POSTs the alert as JSON, e.g. to a local trading service."""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=None):
+        super().__init__(timeout)
+        self.url = url
+        self._http_client = None
+        self._http_loop = None
+
+    async def send(self, alert):
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_loop is not loop:
+            self._http_client = httpx.AsyncClient(timeout=self.timeout)
+            self._http_loop = loop
+        response = await self._http_client.post(self.url, json=alert)
+        response.raise_for_status()
+        return True
+
+
+class UnixSocketSink(AlertSink):
+    """Writes the alert as one JSON line to a Unix domain socket."""
+
+    name = "socket"
+
+    def __init__(self, path, timeout=None):
+        super().__init__(timeout)
+        self.path = path
+
+    async def send(self, alert):
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        try:
+            writer.write(json.dumps(alert).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        return True
+
+
+class AlertFanout:
+    """Sends every alert to all sinks at once.
+
+    Each sink runs as its own task with its own timeout and latency
+    histogram, so a slow or dead sink never delays the others, and
+    publish() itself never waits on any of them.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+        self._tasks = set()
+
+    def publish(self, address, source=None):
+        alert = {"address": address, "source": source, "detected_at": time.time()}
+        tasks = []
+        for sink in self.sinks:
+            task = asyncio.ensure_future(self._deliver(sink, alert))
+            # Keep a reference until done, the loop only holds weak ones
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks.append(task)
+        return tasks
+
+    async def _deliver(self, sink, alert):
+        started = time.monotonic()
+        try:
+            delivered = await asyncio.wait_for(sink.send(alert), sink.timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Alert sink {sink.name} timed out after {sink.timeout}s")
+            metrics.incr(f"sink_{sink.name}_timeouts")
+            return False
+        except Exception as e:
+            logging.error(f"Alert sink {sink.name} failed: {e}")
+            metrics.incr(f"sink_{sink.name}_errors")
+            return False
+        elapsed = time.monotonic() - started
+        if delivered:
+            metrics.observe(f"sink_{sink.name}_latency", elapsed)
+            logging.info(f"Alert for {alert['address']} delivered to {sink.name} in {elapsed:.2f}s")
+        else:
+            metrics.incr(f"sink_{sink.name}_errors")
+        return delivered
+
+
+def build_fanout(user_id):
+    """Fan-out for the current config.
+
+    The starting user always gets alerts. Extra chats come from
+    `alert_chats`, the Telethon forward to the `bot` username from
+    `alert_to_bot`, and the local `alert_webhook` / `alert_socket`.
+    """
+    config = config_collection.find_one() or {}
+    timeouts = {**SINK_TIMEOUTS, **config.get("sink_timeouts", {})}
+
+    chats = [user_id] + [chat for chat in config.get("alert_chats", []) if chat != user_id]
+    sinks = [AdminChatSink(chat, timeouts["admin"]) for chat in chats]
+    if config.get("alert_to_bot", False):
+        sinks.append(TradingBotSink(timeouts["trading_bot"]))
+    if config.get("alert_webhook"):
+        sinks.append(WebhookSink(config["alert_webhook"], timeouts["webhook"]))
+    if config.get("alert_socket"):
+        sinks.append(UnixSocketSink(config["alert_socket"], timeouts["socket"]))
+
+    logging.info(f"Alert sinks: {', '.join(sink.name for sink in sinks)}")
+    return AlertFanout(sinks)
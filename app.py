@@ -8,6 +8,9 @@ from pymongo import MongoClient
 from utils import start_script, stop_script, change_config
 from send_message import send_message_to_bot, get_telegram_connection
 from setup_accounts import setup_accounts 
+import metrics
+import client_pool
+from known_addresses import known_addresses
 
 load_dotenv(override=True)
 
@@ -121,6 +124,18 @@ def handle_block(message):
     except Exception as e:
         bot.reply_to(message, f"Error blocking users: {str(e)}")
 
+@bot.message_handler(func=lambda message: message.text.startswith('/stats') and message.chat.id in owners)
+def handle_stats(message):
+    bot.reply_to(message, f"📈 Hunt stats:\n\n{metrics.format_report()}")
+
+@bot.message_handler(func=lambda message: message.text.startswith('/reload_addresses') and message.chat.id in owners)
+def handle_reload_addresses(message):
+    try:
+        blocked, allowed = known_addresses.reload()
+        bot.reply_to(message, f"✅ Known addresses reloaded!\nBlocked: {blocked}\nAllowed: {allowed}")
+    except Exception as e:
+        bot.reply_to(message, f"Error reloading known addresses: {str(e)}")
+
 
 @bot.message_handler(func=lambda message: True)
 def chat(message):
@@ -224,6 +239,11 @@ def chat(message):
         status_message += f"✅ Active Workers: {len(online_accounts)}\n"
         status_message += f"❌ Offline Workers: {len(offline_accounts)}\n"
         status_message += f"📊 Total Workers: {len(online_accounts) + len(offline_accounts)}"
+
+        # Live latency/error stats while a hunt is running
+        pool = client_pool.active_pool
+        if pool is not None and len(pool):
+            status_message += f"\n\nLive client stats (fastest first):\n{pool.describe()}"
         
         # Create inline keyboard
         markup = telebot.types.InlineKeyboardMarkup()
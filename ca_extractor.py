@@ -0,0 +1,172 @@
+import re
+
+try:
+    from Crypto.Hash import keccak
+except ImportError:  # pycryptodome is in requirements.txt, the pure Python fallback below covers its absence
+    keccak = None
+
+SOLANA = "solana"
+EVM = "evm"
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_VALUES = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+
+# One pass over the text finds both kinds of candidates
+_CANDIDATES = re.compile(
+    r"\b(?:(?P<evm>0x[0-9a-fA-F]{40})|(?P<solana>[1-9A-HJ-NP-Za-km-z]{32,44}))\b"
+)
+
+# Lower rank sorts first
+RANK_PUMP_MINT = 0
+RANK_SOLANA = 1
+RANK_EVM_CHECKSUMMED = 2
+RANK_EVM = 3
+
+
+def base58_decode_length(value):
+    """Number of bytes `value` decodes to, or None if it isn't base58."""
+    number = 0
+    for char in value:
+        digit = _BASE58_VALUES.get(char)
+        if digit is None:
+            return None
+        number = number * 58 + digit
+    leading_zeros = len(value) - len(value.lstrip("1"))
+    return leading_zeros + (number.bit_length() + 7) // 8
+
+
+def is_solana_address(value):
+    # Public keys and mints are exactly 32 bytes, long words and hashes are not
+    return base58_decode_length(value) == 32
+
+
+_KECCAK_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_KECCAK_ROTATIONS = [
+    [0, 36, 3, 41, 18], [1, 44, 10, 45, 2], [62, 6, 43, 15, 61], [28, 55, 25, 21, 56], [27, 20, 39, 8, 14],
+]
+_MASK64 = (1 << 64) - 1
+
+
+def _keccak_f(state):
+    for round_constant in _KECCAK_ROUND_CONSTANTS:
+        c = [state[x][0] ^ state[x][1] ^ state[x][2] ^ state[x][3] ^ state[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ (((c[(x + 1) % 5] << 1) | (c[(x + 1) % 5] >> 63)) & _MASK64) for x in range(5)]
+        state = [[state[x][y] ^ d[x] for y in range(5)] for x in range(5)]
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                r = _KECCAK_ROTATIONS[x][y]
+                b[y][(2 * x + 3 * y) % 5] = ((state[x][y] << r) | (state[x][y] >> (64 - r))) & _MASK64 if r else state[x][y]
+        state = [[b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y]) for y in range(5)] for x in range(5)]
+        state[0][0] ^= round_constant
+    return state
+
+
+def keccak256_hex(data):
+    """Ethereum's Keccak-256 (not hashlib's sha3_256, which pads differently)."""
+    if keccak is not None:
+        return keccak.new(digest_bits=256, data=data).hexdigest()
+    rate = 136
+    padded = bytearray(data) + b"\x01" + bytes((-len(data) - 1) % rate)
+    padded[-1] |= 0x80
+    state = [[0] * 5 for _ in range(5)]
+    for offset in range(0, len(padded), rate):
+        block = padded[offset:offset + rate]
+        for i in range(rate // 8):
+            state[i % 5][i // 5] ^= int.from_bytes(block[i * 8:i * 8 + 8], "little")
+        state = _keccak_f(state)
+    return b"".join(state[i % 5][i // 5].to_bytes(8, "little") for i in range(4)).hex()
+
+
+def evm_checksum(address):
+    """EIP-55 checksum result: True, False, or None when it can't be checked."""
+    body = address[2:]
+    if body.islower() or body.isupper() or body.isdigit():
+        # No checksum encoded, still a valid address
+        return None
+    digest = keccak256_hex(body.lower().encode())
+    for char, nibble in zip(body, digest):
+        if char.isalpha() and char.isupper() != (int(nibble, 16) >= 8):
+            return False
+    return True
+
+
+def chain_of(address):
+    """Best guess of the chain an address belongs to."""
+    return EVM if address.startswith("0x") else SOLANA
+
+
+def _rank(kind, address):
+    if kind == EVM:
+        return RANK_EVM_CHECKSUMMED if evm_checksum(address) else RANK_EVM
+    # pump.fun mints are ground so their base58 form ends in "pump"
+    return RANK_PUMP_MINT if address.endswith("pump") else RANK_SOLANA
+
+
+def extract(text):
+    """Contract addresses in `text`, most likely token mints first, without duplicates."""
+    if not text:
+        return []
+    # Best (rank, position, address) per address, EVM ones compared case-insensitively
+    found = {}
+    for position, match in enumerate(_CANDIDATES.finditer(text)):
+        address = match.group(0)
+        if match.group("evm"):
+            if evm_checksum(address) is False:
+                # Usually OCR misreading the letter case, and EVM addresses are
+                # case-insensitive: keep it, without the checksum's higher rank
+                address = address.lower()
+            kind = EVM
+        elif is_solana_address(address):
+            kind = SOLANA
+        else:
+            continue
+        key = address.lower() if kind == EVM else address
+        entry = (_rank(kind, address), position, address)
+        if key not in found or entry < found[key]:
+            found[key] = entry
+    return [address for _, _, address in sorted(found.values())]
+
+
+def extract_many(texts):
+    """Batch form of extract, one result list per input text."""
+    return [extract(text) for text in texts]
+
+
+if __name__ == "__main__":
+    # Micro-benchmark on large OCR-like texts: python ca_extractor.py
+    import random
+    import string
+    import time
+
+    random.seed(1)
+    words = ["".join(random.choices(string.ascii_letters, k=random.randint(2, 12))) for _ in range(2000)]
+    mint = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+    texts = []
+    for _ in range(200):
+        body = random.choices(words, k=5000)
+        body.insert(random.randint(0, len(body)), mint)
+        body.insert(random.randint(0, len(body)), "0x" + "".join(random.choices("0123456789abcdef", k=40)))
+        texts.append(" ".join(body))
+    size = sum(len(text) for text in texts)
+
+    old_pattern = re.compile(r"\b(?:0x[a-fA-F0-9]{40}|[a-zA-Z0-9]{26,44})\b")
+    started = time.perf_counter()
+    for text in texts:
+        [match.group(0) for match in old_pattern.finditer(text)]
+    old_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = extract_many(texts)
+    new_seconds = time.perf_counter() - started
+
+    print(f"{len(texts)} texts, {size / 1e6:.1f} MB")
+    print(f"old regex: {size / old_seconds / 1e6:.1f} MB/s")
+    print(f"extractor: {size / new_seconds / 1e6:.1f} MB/s, first result {results[0]}")
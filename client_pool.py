@@ -0,0 +1,355 @@
+import asyncio
+import logging
+import random
+import time
+
+# X allows roughly 50 timeline requests per account in a 15 minute window
+RATE_LIMIT_REQUESTS = 50
+RATE_LIMIT_WINDOW = 15 * 60
+# Margin applied only while we have no x-rate-limit-* headers for a client yet
+SAFETY_MARGIN = 1.2
+
+# GraphQL operation names, used as the last path segment of twikit requests
+TIMELINE_ENDPOINT = "UserTweets"
+DETAIL_ENDPOINT = "TweetDetail"
+
+# Weight of the newest sample in the per-client latency and error EWMAs
+EWMA_ALPHA = 0.2
+# Clients failing more often than this are only used for detail fetches as a last resort
+MAX_DETAIL_ERROR_RATE = 0.3
+# Share of ordered picks that go to the client measured longest ago, so one
+# unlucky sample doesn't pin a client to the same role for the whole run
+EXPLORE_PROBABILITY = 0.05
+
+# Module level handle on the running pool so the bot can show live worker stats
+active_pool = None
+
+
+class TokenBucket:
+    """Refills `capacity` tokens evenly over `window` seconds."""
+
+    def __init__(self, capacity=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self, now=None):
+        self.tokens = 0.0
+        self.updated = time.monotonic() if now is None else now
+
+    def reset(self, now=None):
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic() if now is None else now
+
+
+class RateLimitWindow:
+    """Budget the API reported for one endpoint through x-rate-limit-* headers."""
+
+    def __init__(self, limit, remaining, reset_at):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_at = reset_at  # wall clock epoch seconds
+
+    def active(self, wall):
+        return wall < self.reset_at
+
+    def rate(self, wall):
+        """Requests per second we can spend without running out before the reset."""
+        return self.remaining / max(self.reset_at - wall, 1.0)
+
+
+class ClientState:
+    def __init__(self, client, username):
+        self.client = client
+        self.username = username
+        self.bucket = TokenBucket()
+        self.windows = {}
+        self.cooldown_until = 0.0
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.measured_at = 0.0
+
+    def cooling(self, now):
+        return now < self.cooldown_until
+
+    def record(self, latency=None, ok=True):
+        self.requests += 1
+        self.measured_at = time.monotonic()
+        self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        if latency is not None:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += EWMA_ALPHA * (latency - self.latency)
+
+    def score(self):
+        """Expected cost of a request: latency inflated by how often the client fails."""
+        if self.latency is None:
+            # Untried clients go first so they get measured
+            return 0.0
+        return self.latency / max(0.05, 1.0 - self.error_rate)
+
+    async def on_response(self, response):
+        """httpx response hook recording the rate limit headers of every API call."""
+        headers = response.headers
+        try:
+            limit = int(headers["x-rate-limit-limit"])
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset_at = int(headers["x-rate-limit-reset"])
+        except (KeyError, ValueError):
+            return
+        endpoint = response.request.url.path.rsplit("/", 1)[-1]
+        self.windows[endpoint] = RateLimitWindow(limit, remaining, reset_at)
+
+    def _window(self, endpoint, wall):
+        window = self.windows.get(endpoint)
+        if window is not None and window.active(wall):
+            return window
+        return None
+
+    def take(self, endpoint, now, wall):
+        window = self._window(endpoint, wall)
+        if window is None:
+            return self.bucket.try_take(now)
+        if window.remaining <= 0:
+            return False
+        # Spend optimistically, the next response corrects it from the headers
+        window.remaining -= 1
+        return True
+
+    def ready_in(self, endpoint, now, wall):
+        cooldown = self.cooldown_until - now
+        window = self._window(endpoint, wall)
+        if window is None:
+            return max(cooldown, self.bucket.time_until_token(now))
+        if window.remaining <= 0:
+            return max(cooldown, window.reset_at - wall)
+        return max(cooldown, 0.0)
+
+    def rate(self, endpoint, wall):
+        window = self._window(endpoint, wall)
+        if window is None:
+            return RATE_LIMIT_REQUESTS / RATE_LIMIT_WINDOW / SAFETY_MARGIN
+        return window.rate(wall)
+
+
+class ClientPool:
+    """Rotating set of worker clients with a token bucket each.
+
+    Once a client has seen x-rate-limit-* headers for an endpoint, its budget
+    for that endpoint follows the headers instead of the bucket. Rate-limited
+    clients are parked until their window resets instead of being dropped,
+    and the pool keeps growing while accounts log in.
+    """
+
+    def __init__(self):
+        self.states = []
+        self._index = -1
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return len(self.states)
+
+    def _state(self, client):
+        for state in self.states:
+            if state.client is client:
+                return state
+        return None
+
+    def add(self, client, username):
+        state = ClientState(client, username)
+        http = getattr(client, "http", None)
+        if http is not None:
+            http.event_hooks["response"].append(state.on_response)
+        self.states.append(state)
+        self._ready.set()
+        logging.info(f"Client {username} joined the pool ({len(self.states)} total)")
+
+    def remove(self, client):
+        state = self._state(client)
+        if state:
+            self.states.remove(state)
+            logging.info(f"Client {state.username} left the pool ({len(self.states)} total)")
+        if not self.states:
+            self._ready.clear()
+
+    def username(self, client):
+        state = self._state(client)
+        return state.username if state else "unknown"
+
+    def record(self, client, latency=None, ok=True):
+        """Feed a request outcome into the client's latency and error EWMAs."""
+        state = self._state(client)
+        if state:
+            state.record(latency, ok)
+
+    def _readmit(self, now):
+        for state in self.states:
+            if state.cooldown_until and not state.cooling(now):
+                state.cooldown_until = 0.0
+                state.bucket.reset(now)
+                logging.info(f"Client {state.username} cooldown over, back in rotation")
+
+    def available_count(self):
+        """Number of clients that are not cooling down after a rate limit."""
+        now = time.monotonic()
+        self._readmit(now)
+        return sum(1 for state in self.states if not state.cooling(now))
+
+    def _candidates(self, prefer):
+        if prefer == "fast":
+            return self._explore(sorted(self.states, key=ClientState.score))
+        if prefer == "slow":
+            # Slowest healthy clients first by latency alone, a likely failure is no way to spare the fast ones
+            healthy = [state for state in self.states if state.error_rate <= MAX_DETAIL_ERROR_RATE]
+            failing = [state for state in self.states if state.error_rate > MAX_DETAIL_ERROR_RATE]
+            healthy.sort(key=lambda state: state.latency or 0.0, reverse=True)
+            failing.sort(key=lambda state: state.error_rate)
+            return self._explore(healthy) + failing
+        self._index = (self._index + 1) % len(self.states)
+        return self.states[self._index:] + self.states[:self._index]
+
+    def _explore(self, ordered):
+        if len(ordered) > 1 and random.random() < EXPLORE_PROBABILITY:
+            stalest = min(ordered, key=lambda state: state.measured_at)
+            ordered.remove(stalest)
+            ordered.insert(0, stalest)
+        return ordered
+
+    def acquire(self, endpoint=TIMELINE_ENDPOINT, prefer=None, exclude=None):
+        """Return a client with budget for `endpoint`, or None.
+
+        `prefer` picks the order clients are tried in: "fast" for latency
+        critical requests, "slow" to keep the fast clients free, or round-robin.
+        """
+        now, wall = time.monotonic(), time.time()
+        self._readmit(now)
+        if not self.states:
+            return None
+        for state in self._candidates(prefer):
+            if state.client is exclude or state.cooling(now):
+                continue
+            if state.take(endpoint, now, wall):
+                return state.client
+        return None
+
+    def next_ready_in(self, endpoint=TIMELINE_ENDPOINT):
+        """Seconds until some client can take another request on `endpoint`."""
+        now, wall = time.monotonic(), time.time()
+        if not self.states:
+            return 0.0
+        return max(0.0, min(state.ready_in(endpoint, now, wall) for state in self.states))
+
+    def planned_interval(self, endpoint=TIMELINE_ENDPOINT):
+        """Poll interval that spends the pool's combined budget evenly until the resets."""
+        now, wall = time.monotonic(), time.time()
+        self._readmit(now)
+        rate = sum(state.rate(endpoint, wall) for state in self.states if not state.cooling(now))
+        if rate <= 0:
+            return RATE_LIMIT_WINDOW / RATE_LIMIT_REQUESTS * SAFETY_MARGIN
+        return 1 / rate
+
+    def cooldown(self, client, endpoint=TIMELINE_ENDPOINT):
+        """Park a rate-limited client until its window resets."""
+        state = self._state(client)
+        if state is None:
+            return
+        now, wall = time.monotonic(), time.time()
+        window = state.windows.get(endpoint)
+        seconds = window.reset_at - wall if window and window.active(wall) else RATE_LIMIT_WINDOW
+        state.cooldown_until = now + seconds
+        state.bucket.drain(now)
+        logging.warning(f"Client {state.username} rate limited, cooling down for {seconds:.0f}s")
+
+    async def get(self, endpoint=TIMELINE_ENDPOINT, prefer=None):
+        """Wait until a client has budget for another request and return it."""
+        while True:
+            if not self.states:
+                await self._ready.wait()
+            client = self.acquire(endpoint, prefer)
+            if client is not None:
+                return client
+            await asyncio.sleep(self.next_ready_in(endpoint))
+
+    def describe(self):
+        """One line per client with its live latency, error rate and status."""
+        now = time.monotonic()
+        lines = []
+        for state in sorted(self.states, key=ClientState.score):
+            latency = f"{state.latency * 1000:.0f}ms" if state.latency is not None else "n/a"
+            status = "🧊 cooling" if state.cooling(now) else "✅ ready"
+            lines.append(f"@{state.username} - {latency}, {state.error_rate:.0%} errors, "
+                         f"{state.requests} requests, {status}")
+        return "\n".join(lines)
+
+    async def wait_ready(self, init_task):
+        """Wait until at least one client is in the pool or initialization has finished."""
+        if self.states:
+            return True
+        ready = asyncio.ensure_future(self._ready.wait())
+        try:
+            await asyncio.wait({ready, init_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready.cancel()
+        return bool(self.states)
+
+
+if __name__ == "__main__":
+    # Check the scheduler follows changing rate limit headers: python client_pool.py
+    import httpx
+
+    class FakeClient:
+        """Stands in for a twikit Client, which exposes its httpx client as .http."""
+
+        def __init__(self, handler):
+            self.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    # (limit, remaining, seconds until reset) the fake API reports on each call
+    script = [(50, 50, 900), (50, 10, 900), (50, 10, 100), (150, 150, 900), (50, 0, 30)]
+    replies = iter(script)
+
+    def handler(request):
+        limit, remaining, reset_in = next(replies)
+        return httpx.Response(200, json={}, headers={
+            "x-rate-limit-limit": str(limit),
+            "x-rate-limit-remaining": str(remaining),
+            "x-rate-limit-reset": str(int(time.time() + reset_in)),
+        })
+
+    async def check():
+        pool = ClientPool()
+        client = FakeClient(handler)
+        pool.add(client, "fake")
+        print(f"before any response: {pool.planned_interval():.1f}s between polls")
+        for limit, remaining, reset_in in script:
+            await client.http.get(f"https://x.com/i/api/graphql/abc/{TIMELINE_ENDPOINT}")
+            interval = pool.planned_interval()
+            expected = max(reset_in, 1.0) / remaining if remaining else None
+            print(f"limit {limit}, remaining {remaining}, reset in {reset_in}s -> {interval:.1f}s"
+                  + (f" (expected ~{expected:.1f}s)" if expected else ""))
+        print(f"exhausted: acquire -> {pool.acquire()}, next ready in {pool.next_ready_in():.0f}s")
+        pool.cooldown(client)
+        print(f"after cooldown: {pool.available_count()} available")
+
+    asyncio.run(check())
@@ -1,76 +1,125 @@
-import re
+import base64
+import time
+import asyncio
 import logging
-import requests
-from dotenv import load_dotenv
-import os
-
-load_dotenv(override=True)
-
-api_key = os.getenv("OCR_API")
-
-def get_text(data, type="url"):
-    endpoint = "https://ocr-extract-text.p.rapidapi.com/ocr"
-    headers = {
-        "x-rapidapi-key": api_key,
-        "x-rapidapi-host": "ocr-extract-text.p.rapidapi.com",
-    }
-
+from ocr_cache import ocr_cache, cache_key
+from ocr_backends import ocr_router
+from image_prep import twitter_variant
+from image_filter import prefilter, NO_TEXT, OCR
+import metrics
+import ca_extractor
+from known_addresses import known_addresses
+
+# Photos of one tweet OCR'd at the same time
+OCR_CONCURRENCY = 4
+
+# OCR calls in progress by cache key as [task, callers waiting on it], shared by
+# every caller asking for the same image
+_in_flight = {}
+
+async def _prefilter_check(data, type):
     try:
         if type == "url":
-            querystring = {"url": data}
-            response = requests.get(endpoint, headers=headers, params=querystring)
-        else:
-            headers["Content-Type"] = "application/x-www-form-urlencoded"
-            payload = {"base64": data}
-            response = requests.post(endpoint, headers=headers, data=payload)
-
-        response.raise_for_status()
-
-        if response.text:
-            response_json = response.json()
-            print(f"response:", response_json.get("status"))
-            if response_json.get("status"):
-                return response_json.get("text")
-            else:
-                logging.error(f"OCR API returned an error: {response_json.get('error')}")
-                return None
+            image_bytes = await prefilter.fetch(twitter_variant(data, "small"))
         else:
-            logging.error("OCR API returned an empty response.")
-            return None
-
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error during OCR API request: {e}")
-        return None
+            image_bytes = base64.b64decode(data)
     except ValueError as e:
-        logging.error(f"Error decoding JSON response: {e}")
-        return None
+        logging.error(f"Could not decode image for the pre-filter: {e}")
+        return OCR
+    if not image_bytes:
+        return OCR
+    return await asyncio.to_thread(prefilter.check, image_bytes)
+
+
+async def get_text(data, type="url"):
+    # Reposted images cost nothing, the cache is keyed by URL or by the image content
+    key = cache_key(data, type)
+    cached = await ocr_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # The timeline and detail paths of one tweet ask for the same photos at once, OCR them only once
+    entry = _in_flight.get(key)
+    if entry is None or entry[0].get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_read_text(data, type, key))
+        entry = _in_flight[key] = [task, 0]
+        task.add_done_callback(lambda done: _in_flight.pop(key, None) if _in_flight.get(key) is entry else None)
+    else:
+        metrics.incr("ocr_coalesced")
+    task = entry[0]
+    entry[1] += 1
+    try:
+        # One caller giving up must not cancel the OCR another one is waiting on
+        return await asyncio.shield(task)
+    finally:
+        entry[1] -= 1
+        # ...but once nobody is waiting any more, stop paying for it
+        if entry[1] == 0 and not task.done():
+            task.cancel()
+            if _in_flight.get(key) is entry:
+                del _in_flight[key]
+
+
+async def _read_text(data, type, key):
+    if not prefilter.available():
+        text = await ocr_router.extract(data, type)
+        ocr_cache.put(key, text)
+        return text
+
+    if type != "url":
+        # The bytes are already here, a local look costs far less than the OCR call
+        if await _prefilter_check(data, type) == NO_TEXT:
+            logging.info("Pre-filter skipped OCR, no text in image")
+            return ""
+        text = await ocr_router.extract(data, type)
+        ocr_cache.put(key, text)
+        return text
+
+    # Downloading the thumbnail must not delay OCR: run both, drop the OCR call
+    # only if the pre-filter decides first that the image can be skipped
+    ocr_task = asyncio.ensure_future(ocr_router.extract(data, type))
+    filter_task = asyncio.ensure_future(_prefilter_check(data, type))
+    try:
+        done, _ = await asyncio.wait({ocr_task, filter_task}, return_when=asyncio.FIRST_COMPLETED)
+        if filter_task in done and filter_task.exception() is None and filter_task.result() == NO_TEXT:
+            logging.info("Pre-filter skipped OCR, no text in image")
+            ocr_task.cancel()
+            return ""
+        text = await ocr_task
+    except BaseException:
+        ocr_task.cancel()
+        filter_task.cancel()
+        raise
+    # OCR won, the thumbnail check has nothing left to decide
+    filter_task.cancel()
+    ocr_cache.put(key, text)
+    return text
 
 
 def get_contract_address(text) -> list:
     try:
-        logging.info("Attempting to parse contract addresses from the text")
-        pattern = r"\b(?:0x[a-fA-F0-9]{40}|[a-zA-Z0-9]{26,44})\b"
-        
-        matches = re.finditer(pattern, text)
-        contract_addresses = []
-
-        for match in matches:
-            potential_address = match.group(0)
-            
-            # Basic filtering to reduce false positives
-            if 26 <= len(potential_address) <= 44 or potential_address.startswith("0x"):
-                logging.info(f"Found potential contract address: {potential_address}")
-                contract_addresses.append(potential_address)
-            else:
-                logging.info(f"Matched string '{potential_address}' is likely not a valid contract address (filtered out).")
-        
+        contract_addresses = ca_extractor.extract(text)
+        # Well-known tokens, routers and wallets never trigger an alert
+        contract_addresses = known_addresses.filter(contract_addresses)
+        if contract_addresses:
+            logging.info(f"Found potential contract addresses: {contract_addresses}")
         return contract_addresses
 
     except Exception as e:
         logging.error(f"Error while parsing contract address: {e}")
         return []
 
-def get_contract(tweet):
+async def get_image_contracts(image_url, semaphore):
+    async with semaphore:
+        logging.info(f"Processing image: {image_url}")
+        started = time.monotonic()
+        text = await get_text(data=image_url)
+        elapsed = time.monotonic() - started
+    metrics.observe("ocr_latency", elapsed)
+    logging.info(f"OCR of {image_url} took {elapsed:.2f}s")
+    return get_contract_address(text) if text else []
+
+async def get_contract(tweet):
     logging.info("Attempting to parse contract addresses from the tweet")
     
     # First check tweet text
@@ -80,20 +129,27 @@ def get_contract(tweet):
             logging.info(f"Found contracts in tweet text: {contracts}")
             return contracts
     
-    # If no contracts in text, check media
+    # If no contracts in text, OCR every photo at once, the first one with a CA wins
     if tweet.media:  # Simplified media check
         logging.info("No contracts found in tweet text, checking media")
-        for media in tweet.media:
-            if media.get("type") == "photo":
-                image_url = media.get("media_url_https")
-                logging.info(f"Processing image: {image_url}")
-                
-                text = get_text(data=image_url)
-                if text:
-                    contracts = get_contract_address(text)
-                    if contracts:  # If contracts were found in image
-                        logging.info(f"Found contracts in image: {contracts}")
-                        return contracts
+        # Ask pbs.twimg.com for a smaller rendition instead of the original upload
+        image_urls = [twitter_variant(media.get("media_url_https")) for media in tweet.media if media.get("type") == "photo"]
+        semaphore = asyncio.Semaphore(OCR_CONCURRENCY)
+        tasks = [asyncio.ensure_future(get_image_contracts(image_url, semaphore)) for image_url in image_urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    contracts = await next_done
+                except Exception as e:
+                    logging.error(f"Error while processing tweet image: {e}")
+                    continue
+                if contracts:  # If contracts were found in image
+                    logging.info(f"Found contracts in image: {contracts}")
+                    return contracts
+        finally:
+            # Whatever is still being OCR'd is no longer needed
+            for task in tasks:
+                task.cancel()
     
     logging.info("No contracts found in tweet text or media")
     return []
@@ -106,7 +162,7 @@ def main():
         if image_url:
             # Test get_text function
             print("\nProcessing image...")
-            text = get_text(data=image_url)
+            text = asyncio.run(get_text(data=image_url))
             if text:
                 print("\nExtracted text from image:")
                 print("-" * 50)
@@ -0,0 +1,88 @@
+import asyncio
+import io
+import logging
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+import metrics
+
+try:
+    from PIL import Image, ImageFilter
+except ImportError:  # without Pillow every image goes straight to OCR
+    Image = None
+    ImageFilter = None
+
+load_dotenv()
+
+OCR_PREFILTER = os.getenv("OCR_PREFILTER", "1").lower() in ("1", "true", "yes")
+# Share of edge pixels below which an image almost surely holds no 32-44 char address
+OCR_MIN_EDGE_DENSITY = float(os.getenv("OCR_MIN_EDGE_DENSITY", 0.002))
+DENSITY_SIDE = 256
+EDGE_THRESHOLD = 64
+
+NO_TEXT = "no_text"
+OCR = "ocr"
+
+
+def edge_density(image):
+    """Share of strong edge pixels on a small grayscale copy of the image."""
+    small = image.convert("L")
+    small.thumbnail((DENSITY_SIDE, DENSITY_SIDE))
+    edges = small.filter(ImageFilter.FIND_EDGES)
+    # FIND_EDGES lights up the outer border on every image, ignore it
+    edges = edges.crop((1, 1, max(2, edges.width - 1), max(2, edges.height - 1)))
+    histogram = edges.histogram()
+    return sum(histogram[EDGE_THRESHOLD:]) / (edges.width * edges.height)
+
+
+class ImagePreFilter:
+    """Decides locally whether an image is worth an OCR call.
+
+    Only images with almost no edges are skipped. Perceptual hashes are
+    deliberately not used: a "CA: coming soon" teaser and the same template
+    with the address filled in hash almost the same. Reuse of OCR text is
+    left to exact content matches, which ocr_cache handles.
+    """
+
+    def __init__(self, min_edge_density=OCR_MIN_EDGE_DENSITY):
+        self.min_edge_density = min_edge_density
+        # One pooled client per event loop for thumbnail downloads
+        self._http_client = None
+        self._http_loop = None
+
+    def available(self):
+        return OCR_PREFILTER and Image is not None
+
+    def check(self, image_bytes):
+        """Return NO_TEXT to skip OCR, OCR otherwise."""
+        if Image is None or not image_bytes:
+            return OCR
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                if edge_density(image) < self.min_edge_density:
+                    metrics.incr("ocr_skipped_no_text")
+                    return NO_TEXT
+        except Exception as e:
+            logging.error(f"Image pre-filter failed, sending to OCR: {e}")
+            return OCR
+        metrics.incr("ocr_prefilter_passed")
+        return OCR
+
+    async def fetch(self, url):
+        """Download an image for the pre-filter, None if it can't be fetched."""
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_loop is not loop:
+            self._http_client = httpx.AsyncClient(timeout=httpx.Timeout(5.0, connect=2.0))
+            self._http_loop = loop
+        try:
+            response = await self._http_client.get(url)
+            response.raise_for_status()
+            return response.content
+        except httpx.HTTPError as e:
+            logging.error(f"Could not download {url} for the pre-filter: {e}")
+            return None
+
+
+prefilter = ImagePreFilter()
@@ -0,0 +1,107 @@
+import io
+import logging
+import os
+import re
+
+from dotenv import load_dotenv
+
+try:
+    from PIL import Image, ImageFilter
+except ImportError:  # without Pillow images are uploaded untouched
+    Image = None
+    ImageFilter = None
+
+load_dotenv()
+
+# Longest side we send to OCR, addresses stay readable well below full resolution
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 1600))
+OCR_JPEG_QUALITY = 85
+OCR_CROP = os.getenv("OCR_CROP", "").lower() in ("1", "true", "yes")
+# pbs.twimg.com serves small (680px), medium (1200px), large (2048px) and orig
+TWITTER_MEDIA_SIZE = os.getenv("TWITTER_MEDIA_SIZE", "medium")
+
+# Pixels brighter than this on the edge map count as text strokes when cropping
+EDGE_THRESHOLD = 64
+CROP_PADDING = 0.02
+
+# Matches both the original media URL and an already sized rendition of it
+_TWITTER_MEDIA = re.compile(
+    r"^(https://pbs\.twimg\.com/media/[^.?]+)(?:\.(jpg|jpeg|png|webp)|\?format=(\w+)&name=\w+)$"
+)
+
+
+def twitter_variant(url, size=TWITTER_MEDIA_SIZE):
+    """URL of a smaller rendition of a Twitter photo, or the URL unchanged."""
+    match = _TWITTER_MEDIA.match(url or "")
+    if not match:
+        return url
+    return f"{match.group(1)}?format={match.group(2) or match.group(3)}&name={size}"
+
+
+def _crop_to_text(image):
+    edges = image.filter(ImageFilter.FIND_EDGES).point(lambda p: 255 if p > EDGE_THRESHOLD else 0)
+    bbox = edges.getbbox()
+    if not bbox:
+        return image
+    pad_x = int(image.width * CROP_PADDING)
+    pad_y = int(image.height * CROP_PADDING)
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - pad_x),
+        max(0, top - pad_y),
+        min(image.width, right + pad_x),
+        min(image.height, bottom + pad_y),
+    ))
+
+
+def prepare_image(image_bytes, max_side=OCR_MAX_SIDE, crop=OCR_CROP):
+    """Downscale, grayscale, optionally crop and re-encode an image for OCR upload.
+
+    Returns the original bytes if Pillow is missing, the image can't be
+    decoded, or the result would not be smaller.
+    """
+    if Image is None:
+        return image_bytes
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = image.convert("L")
+            image.thumbnail((max_side, max_side))
+            if crop:
+                image = _crop_to_text(image)
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+    except Exception as e:
+        logging.error(f"Image pre-processing failed, sending the original: {e}")
+        return image_bytes
+    prepared = output.getvalue()
+    return prepared if len(prepared) < len(image_bytes) else image_bytes
+
+
+if __name__ == "__main__":
+    # Benchmark: python image_prep.py <image>... [--ocr]
+    import asyncio
+    import base64
+    import sys
+    import time
+
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    run_ocr = "--ocr" in sys.argv
+
+    async def ocr_latency(image_bytes):
+        from ocr_backends import ocr_router
+        started = time.monotonic()
+        await ocr_router.extract(base64.b64encode(image_bytes).decode(), type="base64")
+        return time.monotonic() - started
+
+    for path in paths:
+        with open(path, "rb") as f:
+            original = f.read()
+        started = time.monotonic()
+        prepared = prepare_image(original)
+        prep_ms = (time.monotonic() - started) * 1000
+        print(f"{path}: {len(base64.b64encode(original))} -> {len(base64.b64encode(prepared))} "
+              f"upload bytes, pre-processing {prep_ms:.1f}ms")
+        if run_ocr:
+            before = asyncio.run(ocr_latency(original))
+            after = asyncio.run(ocr_latency(prepared))
+            print(f"  OCR latency {before:.2f}s -> {after:.2f}s")
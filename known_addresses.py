@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+import metrics
+
+load_dotenv()
+
+MONGO_URL = os.getenv('MONGO_URL')
+mongo_client = MongoClient(MONGO_URL)
+db_name = os.getenv('DATABASE_NAME')
+db = mongo_client[db_name]
+known_addresses_collection = db['known_addresses']
+
+# Optional local list, one "block|allow <address> [label]" per line
+KNOWN_ADDRESSES_FILE = os.getenv("KNOWN_ADDRESSES_FILE", "known_addresses.txt")
+
+# Addresses the target posts all the time that are never a new token
+DEFAULT_BLOCKED = {
+    "So11111111111111111111111111111111111111112": "wrapped SOL",
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC (Solana)",
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB": "USDT (Solana)",
+    "11111111111111111111111111111111": "Solana system program",
+    "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA": "SPL token program",
+    "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2": "WETH",
+    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48": "USDC (Ethereum)",
+    "0xdac17f958d2ee523a2206206994597c13d831ec7": "USDT (Ethereum)",
+    "0x7a250d5630b4cf539739df2c5dacb4c659f2488d": "Uniswap V2 router",
+}
+
+
+def normalize(address):
+    # EVM addresses are case-insensitive, base58 ones are not
+    address = address.strip()
+    return address.lower() if address.startswith("0x") else address
+
+
+class KnownAddressIndex:
+    """In-memory block/allow lists consulted before a CA alert fires.
+
+    Built from the defaults, the known_addresses Mongo collection and an
+    optional local file. Lookups are a set membership test; reload()
+    swaps in a freshly built index without interrupting readers.
+    """
+
+    def __init__(self):
+        self.blocked = {}
+        self.allowed = frozenset()
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def _read_file(self, path, blocked, allowed):
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split(maxsplit=2)
+                if not parts or parts[0].startswith("#"):
+                    continue
+                if parts[0] in ("block", "allow") and len(parts) >= 2:
+                    kind, address, label = parts[0], parts[1], parts[2].strip() if len(parts) > 2 else ""
+                else:
+                    kind, address, label = "block", parts[0], ""
+                if kind == "allow":
+                    allowed.add(normalize(address))
+                else:
+                    blocked[normalize(address)] = label or address
+
+    def reload(self):
+        blocked = {normalize(address): label for address, label in DEFAULT_BLOCKED.items()}
+        allowed = set()
+        try:
+            for doc in known_addresses_collection.find({}):
+                address = normalize(doc.get("address", ""))
+                if not address:
+                    continue
+                if doc.get("kind") == "allow":
+                    allowed.add(address)
+                else:
+                    blocked[address] = doc.get("label") or address
+        except Exception as e:
+            logging.error(f"Failed to load known addresses from MongoDB: {e}")
+        try:
+            self._read_file(KNOWN_ADDRESSES_FILE, blocked, allowed)
+        except OSError as e:
+            logging.error(f"Failed to read {KNOWN_ADDRESSES_FILE}: {e}")
+
+        with self._lock:
+            self.blocked = blocked
+            self.allowed = frozenset(allowed)
+            self.loaded = True
+        logging.info(f"Known address index loaded: {len(blocked)} blocked, {len(allowed)} allowed")
+        return len(blocked), len(allowed)
+
+    def is_blocked(self, address):
+        if not self.loaded:
+            self.reload()
+        address = normalize(address)
+        if address in self.allowed:
+            return False
+        label = self.blocked.get(address)
+        if label is None:
+            return False
+        metrics.incr("known_address_hits")
+        metrics.incr(f"known_address_hits[{label}]")
+        return True
+
+    def filter(self, addresses):
+        """Drop blocked addresses, keeping the order of the rest."""
+        return [address for address in addresses if not self.is_blocked(address)]
+
+
+known_addresses = KnownAddressIndex()
@@ -2,14 +2,22 @@ import asyncio
 from dotenv import load_dotenv
 import os
 from twikit import Client, Tweet
+import client_pool
+from client_pool import ClientPool, DETAIL_ENDPOINT
+from poll_timer import FixedRateTimer
+from tweet_diff import NewTweetDetector, snowflake_time, tweet_age
 from get_client import get_or_create_client  
 from send_message import send_message_to_bot
 import logging
-import random
+import time
 import telebot
+import metrics
 from get_ca import get_contract
+from alert_dedup import alert_dedup
+from alert_fanout import build_fanout
+from action_hooks import action_hooks
+from known_addresses import known_addresses
 from pymongo import MongoClient
-from datetime import datetime, timedelta
 
 load_dotenv()
 
@@ -38,32 +46,91 @@ logging.basicConfig(
 )
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-async def callback(tweet: Tweet,user_id) -> None:
-    ADMIN_USER_ID = user_id
-    logging.info(f"New tweet posted: {tweet.text}")
+# Tweets older than this are not worth alerting on
+MAX_TWEET_AGE = 2 * 60
+
+async def extract_contract(tweet: Tweet) -> list:
     logging.info(f"New tweet posted: {tweet.text}")
     logging.info(f"tweet created at: {tweet.created_at}")
     
-    # Parse tweet creation time and check if it's older than 2 minutes
-    tweet_time = datetime.strptime(tweet.created_at, "%a %b %d %H:%M:%S %z %Y")
-    current_time = datetime.now(tweet_time.tzinfo)
-    time_difference = current_time - tweet_time
-    logging.info(time_difference)
-    if time_difference > timedelta(minutes=2):
+    # The poller already filters stale entries, this catches tweets that aged during the detail fetch
+    age = tweet_age(tweet.id)
+    logging.info(f"tweet age: {age:.1f}s")
+    if age > MAX_TWEET_AGE:
         logging.info("Tweet is older than 2 minutes, skipping processing")
-        return
+        return []
     
     if tweet.retweeted_tweet:
         logging.info("its retweets so im passing!")
-        return
-    result = get_contract(tweet)
-
-    if result:
-        # await send_message_to_bot(your_message=result[0])  # Now this await is valid
-        bot.send_message(ADMIN_USER_ID,f"{result[0]}")
-        # bot.send_message(ADMIN_USER_ID,f"New tweet posted: {tweet.text}")
-        # bot.send_message(ADMIN_USER_ID,f"Contract Address Found: {result[0]}\n")
-        return      
+        return []
+    return await get_contract(tweet)
+
+async def fetch_details(item: Tweet, pool) -> Tweet:
+    # Detail fetches go to the slower clients, the fast ones stay free for polling
+    client = await pool.get(DETAIL_ENDPOINT, prefer="slow")
+    try:
+        return await _fetch_details_with(client, item, pool)
+    except Exception as e:
+        # A truncated tweet only has its CA in the full text, give it one more try elsewhere
+        retry_client = pool.acquire(DETAIL_ENDPOINT, prefer="slow", exclude=client)
+        if retry_client is None:
+            raise
+        logging.warning(f"Detail fetch of {item.id} failed ({e}), retrying with another client")
+        return await _fetch_details_with(retry_client, item, pool)
+
+async def _fetch_details_with(client, item, pool):
+    logging.info(f"Fetching full tweet details using client: {pool.username(client)}")
+    fetch_started = time.monotonic()
+    try:
+        tweet = await client.get_tweet_by_id(item.id)
+    except Exception:
+        pool.record(client, ok=False)
+        raise
+    pool.record(client, time.monotonic() - fetch_started)
+    return tweet
+
+async def extract_from_details(item: Tweet, pool) -> list:
+    return await extract_contract(await fetch_details(item, pool))
+
+async def callback(item: Tweet, pool, fanout) -> None:
+    """Look for a CA in a new tweet.
+
+    The timeline entry usually already carries the text and media, so
+    extraction starts on it right away while the full tweet is fetched in
+    parallel. Whichever finds a contract first raises the alert, the other
+    is cancelled so the same tweet never alerts twice.
+    """
+    sources = {
+        asyncio.ensure_future(extract_contract(item)): "timeline",
+        asyncio.ensure_future(extract_from_details(item, pool)): "detail",
+    }
+    pending = set(sources)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logging.error(f"Error processing tweet {item.id} from {sources[task]}: {task.exception()}")
+                    continue
+                result = task.result()
+                if result:
+                    logging.info(f"Contract found in tweet {item.id} via {sources[task]}")
+                    metrics.incr(f"ca_first_from_{sources[task]}")
+                    # The first address not alerted yet, an old CA must not hide a new one in the same tweet
+                    fresh = alert_dedup.first_fresh(result)
+                    if not fresh:
+                        logging.info(f"{result} were already alerted, skipping")
+                        return
+                    # In-process hooks (auto-buy) first, they are the fastest way out
+                    action_hooks.emit(fresh[0], source=f"tweet:{item.id}", posted_at=snowflake_time(item.id))
+                    # Admin chats, trading bot and local sinks all at once, without waiting on them
+                    fanout.publish(fresh[0], source=f"tweet:{item.id}")
+                    # bot.send_message(ADMIN_USER_ID,f"New tweet posted: {tweet.text}")
+                    # bot.send_message(ADMIN_USER_ID,f"Contract Address Found: {result[0]}\n")
+                    return
+    finally:
+        for task in pending:
+            task.cancel()
     # bot.send_message(ADMIN_USER_ID,f"New tweet posted: {tweet.text}")
     # bot.send_message(ADMIN_USER_ID,f"No CA Found!")
 
@@ -85,7 +152,74 @@ async def get_latest_tweet(user, client,ADMIN_USER_ID) -> list:
         # bot.send_message(ADMIN_USER_ID,f"Error while fetching latest tweets for user {user.name}: {e}")
         raise MaxRetriesExceededError(f"Max retries exceeded for client {client}")
 
-async def initialize_clients(user_id):
+# Hedging needs a few latency samples before its percentile means anything
+MIN_HEDGE_SAMPLES = 20
+
+async def timed_fetch(user, client, pool):
+    started = time.monotonic()
+    try:
+        tweets = await get_latest_tweet(user, client, ADMIN_USER_ID)
+    except RateLimitError:
+        pool.cooldown(client)
+        raise
+    except asyncio.CancelledError:
+        # A hedge loser never finished: no latency sample, and losing a race is no error
+        raise
+    except Exception:
+        pool.record(client, ok=False)
+        raise
+    elapsed = time.monotonic() - started
+    metrics.observe("timeline_latency", elapsed)
+    pool.record(client, elapsed)
+    return tweets
+
+async def fetch_timeline(user, pool, hedge_percentile):
+    """Fetch the target timeline, hedging on a second client when the first is slow."""
+    client = await pool.get(prefer="fast")
+    started = time.monotonic()
+    primary = asyncio.ensure_future(timed_fetch(user, client, pool))
+    if not hedge_percentile or metrics.sample_count("timeline_latency") < MIN_HEDGE_SAMPLES:
+        return await primary
+
+    hedge_after = metrics.percentile("timeline_latency", hedge_percentile)
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    except asyncio.CancelledError:
+        # asyncio.wait doesn't cancel what it waits on
+        primary.cancel()
+        raise
+    if done:
+        return primary.result()
+
+    # The hedge takes a token like any other request, so it is charged to the budget
+    backup = pool.acquire(prefer="fast", exclude=client)
+    if backup is None:
+        return await primary
+    metrics.incr("timeline_hedges")
+    logging.info(f"Client {pool.username(client)} slower than p{hedge_percentile} ({hedge_after:.2f}s), "
+                 f"hedging on {pool.username(backup)}")
+    hedge = asyncio.ensure_future(timed_fetch(user, backup, pool))
+
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        metrics.incr("timeline_hedge_wins")
+                        if not primary.done():
+                            # The primary missed the hedge deadline and took at least this long
+                            pool.record(client, time.monotonic() - started)
+                    return task.result()
+        # Both failed, surface the primary's error to the poller
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def initialize_clients(user_id, pool=None):
+    """Log in every worker account. Clients are added to `pool` as soon as they are ready."""
     ADMIN_USER_ID = user_id
     clients = []
     all_accounts = []
@@ -109,23 +243,38 @@ async def initialize_clients(user_id):
             account['offline'] = False
             all_accounts.append(account)
     
-    # Try to initialize clients for all accounts
-    for account in all_accounts:
-        try:
-            # Add delay between account initialization attempts
-            # await asyncio.sleep(3)
-            
-            client = await get_or_create_client(account)
-            if client:
-                clients.append(client)
-                successful_accounts.append(account['username'])
-                logging.info(f"Successfully initialized client for {account['username']}")
-            else:
-                failed_accounts.append(account['username'])
-                logging.warning(f"Failed to initialize client for {account['username']}")
-        except Exception as e:
-            failed_accounts.append(account['username'])
-            logging.error(f"Failed to initialize client for {account.get('username', 'unknown')}: {e}")
+    # Initialize all accounts concurrently, bounded so we don't hammer the login flow
+    configs = config_collection.find_one() or {}
+    concurrency = max(1, int(configs.get("init_concurrency", 8)))
+    init_timeout = float(configs.get("init_timeout", 60))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def init_account(account):
+        username = account.get('username', 'unknown')
+        async with semaphore:
+            try:
+                client = await asyncio.wait_for(get_or_create_client(account), timeout=init_timeout)
+                if client and pool is not None:
+                    pool.add(client, username)
+                return client
+            except asyncio.TimeoutError:
+                logging.error(f"Timed out after {init_timeout}s initializing client for {username}")
+            except Exception as e:
+                logging.error(f"Failed to initialize client for {username}: {e}")
+            return None
+
+    logging.info(f"Initializing {len(all_accounts)} clients (concurrency {concurrency}, timeout {init_timeout}s)")
+    results = await asyncio.gather(*(init_account(account) for account in all_accounts))
+
+    # Keep the original account order so the summary reads the same as before
+    for account, client in zip(all_accounts, results):
+        if client:
+            clients.append(client)
+            successful_accounts.append(account['username'])
+            logging.info(f"Successfully initialized client for {account['username']}")
+        else:
+            failed_accounts.append(account.get('username', 'unknown'))
+            logging.warning(f"Failed to initialize client for {account.get('username', 'unknown')}")
     
     # Send summary message through telegram
     summary_message = (
@@ -147,124 +296,130 @@ def stop_main():
     running = False
 # ---
 
-def recalculate_interval(num_clients):
-    RATE_LIMIT_REQUESTS = 50 
-    RATE_LIMIT_WINDOW = 15 * 60
-    
-    total_requests_per_window = RATE_LIMIT_REQUESTS * num_clients
-    # Add 20% safety margin
-    safe_interval = (RATE_LIMIT_WINDOW / total_requests_per_window) * 1.2
-    return safe_interval
-
 async def main(TARGET, CHECK_INTERVAL,user_id):
     global running
     global ADMIN_USER_ID
     ADMIN_USER_ID = user_id
     running = True
+    started_at = time.monotonic()
     bot.send_message(ADMIN_USER_ID,f"Initializing clients...")
-    clients = await initialize_clients(user_id)
-    num_clients = len(clients)
 
-    if num_clients == 0:
+    # Start polling with the first healthy client, the rest join the rotation as they log in
+    pool = ClientPool()
+    client_pool.active_pool = pool
+    init_task = asyncio.ensure_future(initialize_clients(user_id, pool))
+    try:
+        await hunt(TARGET, user_id, pool, init_task, started_at)
+    finally:
+        client_pool.active_pool = None
+        if not init_task.done():
+            init_task.cancel()
+
+async def hunt(TARGET, user_id, pool, init_task, started_at):
+    if not await pool.wait_ready(init_task):
         logging.error("No clients initialized. Exiting...")
         bot.send_message(ADMIN_USER_ID,"No clients initialized. Exiting...")
         bot.send_message(ADMIN_USER_ID,f"script stopped")
         return
 
-    #
-    RATE_LIMIT_REQUESTS = 50 
-    RATE_LIMIT_WINDOW = 15 * 60  
-    
-    # Calculate requests per second we can make with all clients combined
-    total_requests_per_window = RATE_LIMIT_REQUESTS * num_clients
-    # Add 20% safety margin to avoid hitting limits
-    safe_interval = (RATE_LIMIT_WINDOW / total_requests_per_window) * 1.2
-    
-    # Use the calculated interval or the minimum CHECK_INTERVAL, whichever is larger
-    check_interval = safe_interval
+    num_clients = len(pool)
+    check_interval = pool.planned_interval()
     
     logging.info(f"Calculated interval: {check_interval:.2f} seconds with {num_clients} clients")
     #bot.send_message(533017326, f"Running with interval: {check_interval:.2f} seconds using {num_clients} clients")
     bot.send_message(ADMIN_USER_ID, f"Estimated delay {check_interval:.2f} seconds.")
-    index = 0
     logging.info(f"Requesting user info for target: {TARGET}")
     try:
-        user = await clients[index].get_user_by_screen_name(TARGET)
+        user = await (await pool.get()).get_user_by_screen_name(TARGET)
     except Exception as e:
         logging.error(f"Failed to fetch user info for target {TARGET}: {e}")
         bot.send_message(ADMIN_USER_ID,f"Failed to fetch user info for target {TARGET}: {e}")
         bot.send_message(ADMIN_USER_ID,f"script stopped")
         return
 
-    before_tweet = None
+    # N pollers share the budget on staggered phases so a timeline request is always in flight
+    configs = config_collection.find_one() or {}
+    num_pollers = max(1, int(configs.get("pollers", 1)))
+    hedge_percentile = float(configs.get("hedge_percentile", 95))
+    detector = NewTweetDetector()
+    fanout = build_fanout(user_id)
+    action_hooks.load_from_config()
+    # Load now, not on the first lookup while a CA is waiting to be alerted
+    known_addresses.reload()
     bot.send_message(ADMIN_USER_ID,f"Searching for CA...")
-    
-    while running:
-        if not before_tweet:
+
+    async def poll_loop(phase):
+        nonlocal num_clients, started_at
+        # Each poller fires every N intervals, offset by its phase, so the pool as a whole polls every interval
+        timer = FixedRateTimer(check_interval * num_pollers, name=f"poller_{phase}")
+        timer.start(phase * check_interval)
+
+        while running:
+            # Plan from the live rate limit headers, clients joining or cooling down change the budget
+            interval = pool.planned_interval()
+            timer.set_interval(interval * num_pollers)
+            available = pool.available_count()
+            if available != num_clients and available > 0:
+                num_clients = available
+                logging.info(f"Available clients changed, interval now {interval:.2f} seconds with {num_clients} clients")
+
+            if not len(pool):
+                if not await pool.wait_ready(init_task):
+                    return False
+                continue
+
+            # Fixed-rate: the fetch and callback time of the last poll is already part of this wait
+            logging.info(f"Poller {phase} waiting for the next check...")
+            await timer.wait()
+
+            logging.info(f"Poller {phase} fetching latest tweets")
             try:
-                logging.info(f"Fetching initial tweets using client index {index}.")
-                before_tweet = await get_latest_tweet(user, clients[index],ADMIN_USER_ID)
+                latest_tweet = await fetch_timeline(user, pool, hedge_percentile)
             except RateLimitError:
-                logging.warning(f"Rate limit hit for client {index}, removing client")
-                # bot.send_message(ADMIN_USER_ID, f"⚠️ Client {index} rate limited and removed. Recalculating interval...")
-                clients.pop(index)
-                if not clients:
-                    bot.send_message(ADMIN_USER_ID, "❌ No clients remaining. Stopping script.")
-                    return
-                check_interval = recalculate_interval(len(clients))
-                index = index % len(clients)
+                # bot.send_message(ADMIN_USER_ID, f"⚠️ Client {index} rate limited and removed.")
                 continue
-            except MaxRetriesExceededError:
-                logging.warning(f"Client at index {index} failed to fetch initial tweets.")
-                index = (index + 1) % len(clients)
+            except MaxRetriesExceededError as e:
+                logging.warning(f"Poller {phase} failed to fetch latest tweets: {e}")
                 continue
             except Exception as e:
-                logging.error(f"Unexpected error while fetching initial tweets: {e}")
-                index = (index + 1) % len(clients)
+                logging.error(f"Unexpected error while fetching latest tweets: {e}")
                 continue
 
-        logging.info("Waiting for the next check...")
-        random_seconds = random.randint(0, 3)/10
-        print(f"Sleeping for {check_interval + random_seconds} seconds")
-        await asyncio.sleep(check_interval + random_seconds)
-
-        index = (index + 1) % len(clients)
-
-        logging.info(f"Fetching latest tweets using client index: {index}")
-        try:
-            latest_tweet = await get_latest_tweet(user, clients[index],ADMIN_USER_ID)
-        except RateLimitError:
-            logging.warning(f"Rate limit hit for client {index}, removing client")
-            # bot.send_message(ADMIN_USER_ID, f"⚠️ Client {index} rate limited and removed.")
-            clients.pop(index)
-            if not clients:
-                bot.send_message(ADMIN_USER_ID, "❌ No clients remaining. Stopping script.")
-                return
-            check_interval = recalculate_interval(len(clients))
-            # bot.send_message(ADMIN_USER_ID, f"Estimated delay {check_interval:.2f} seconds.")
-            index = index % len(clients)
-            continue
-        except MaxRetriesExceededError:
-            logging.warning(f"Client at index {index} failed to fetch latest tweets.")
-            continue
-        except Exception as e:
-            logging.error(f"Unexpected error while fetching latest tweets: {e}")
-            continue
-
-        difference = [item for item in latest_tweet if item not in before_tweet]
-
-        if difference:
-            for item in difference:
-                index = (index + 1) % len(clients)
-                logging.info(f"Fetching full tweet details using client index: {index}")
+            if started_at is not None:
+                elapsed = time.monotonic() - started_at
+                started_at = None
+                logging.info(f"First poll completed at T+{elapsed:.1f}s")
+                bot.send_message(ADMIN_USER_ID, f"⏱ First poll at T+{elapsed:.1f}s with {len(pool)} client(s)")
+
+            for item in detector.new_items(latest_tweet):
+                # The ID and the timeline entry tell us enough to skip a rate-limited detail fetch
+                age = tweet_age(item.id)
+                if age > MAX_TWEET_AGE:
+                    logging.info(f"Tweet {item.id} is {age:.0f}s old, skipping detail fetch")
+                    metrics.incr("detail_fetches_saved_stale")
+                    continue
+                if item.retweeted_tweet:
+                    logging.info(f"Tweet {item.id} is a retweet, skipping detail fetch")
+                    metrics.incr("detail_fetches_saved_retweet")
+                    continue
+
                 try:
-                    tweet = await clients[index].get_tweet_by_id(item.id)
-                    await callback(tweet,user_id)
+                    await callback(item, pool, fanout)
                 except Exception as e:
-                    logging.error(f"Error fetching tweet details: {e}")
-                    continue
+                    logging.error(f"Error processing tweet {item.id}: {e}")
 
-        before_tweet = latest_tweet
+        timer.report()
+        return True
 
-    print("Main loop stopped.") # Indicate that the loop has exited
+    pollers = [asyncio.ensure_future(poll_loop(phase)) for phase in range(num_pollers)]
+    try:
+        results = await asyncio.gather(*pollers)
+    finally:
+        for poller in pollers:
+            poller.cancel()
 
+    if not all(results):
+        bot.send_message(ADMIN_USER_ID, "❌ No clients remaining. Stopping script.")
+        return
+
+    print("Main loop stopped.") # Indicate that the loop has exited
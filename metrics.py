@@ -0,0 +1,67 @@
+import threading
+from collections import defaultdict, deque
+
+# Shared between the hunt loop thread and the Flask/telebot threads
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_samples = defaultdict(lambda: deque(maxlen=1000))
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    """Record a sample (latencies are in seconds) for percentile reporting."""
+    with _lock:
+        _samples[name].append(value)
+
+
+def percentile(name, q):
+    with _lock:
+        values = sorted(_samples.get(name, ()))
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def sample_count(name):
+    with _lock:
+        return len(_samples.get(name, ()))
+
+
+def count(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "samples": {name: list(values) for name, values in _samples.items()},
+        }
+
+
+def format_report():
+    data = snapshot()
+    lines = []
+    for name, value in sorted(data["gauges"].items()):
+        lines.append(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name}: {value}")
+    for name, values in sorted(data["samples"].items()):
+        if values:
+            p50 = percentile(name, 50)
+            p95 = percentile(name, 95)
+            lines.append(f"{name}: p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms (n={len(values)})")
+    return "\n".join(lines) if lines else "No stats recorded yet."
@@ -0,0 +1,347 @@
+import asyncio
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+from dotenv import load_dotenv
+
+import ca_extractor
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # the local engine is optional, RapidAPI works without it
+    pytesseract = None
+    Image = None
+
+load_dotenv(override=True)
+
+api_key = os.getenv("OCR_API")
+# Overridable so a local stand-in server can be used instead of RapidAPI
+OCR_ENDPOINT = os.getenv("OCR_URL", "https://ocr-extract-text.p.rapidapi.com/ocr")
+
+# Fail fast on a dead connection, give the OCR itself a bit longer
+OCR_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+OCR_RETRIES = 2
+# Total seconds a single OCR call may spend across all attempts
+OCR_RETRY_BUDGET = 15.0
+
+# How backends are combined: remote, local, local-first, remote-first or race
+OCR_POLICY = os.getenv("OCR_POLICY", "remote").lower()
+
+
+class OCRBackend:
+    """Turns an image (URL or base64 string) into text, or None on failure."""
+
+    name = "base"
+
+    def __init__(self):
+        # One pooled client per event loop, the hunt gets a fresh loop on every start
+        self._http_client = None
+        self._http_loop = None
+
+    def _client_options(self):
+        return {}
+
+    def _http(self):
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_loop is not loop:
+            self._http_client = httpx.AsyncClient(
+                timeout=OCR_TIMEOUT,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=60),
+                **self._client_options(),
+            )
+            self._http_loop = loop
+        return self._http_client
+
+    def available(self):
+        return True
+
+    async def extract(self, data, type="url"):
+        raise NotImplementedError
+
+
+def _attempt_timeout(remaining):
+    # No phase of an attempt may run past what is left of the retry budget
+    return httpx.Timeout(
+        connect=min(OCR_TIMEOUT.connect, remaining),
+        read=min(OCR_TIMEOUT.read, remaining),
+        write=min(OCR_TIMEOUT.write, remaining),
+        pool=min(OCR_TIMEOUT.pool, remaining),
+    )
+
+
+def _retryable(error):
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class RapidAPIBackend(OCRBackend):
+    name = "rapidapi"
+
+    def _client_options(self):
+        return {
+            "headers": {
+                "x-rapidapi-key": api_key or "",
+                "x-rapidapi-host": "ocr-extract-text.p.rapidapi.com",
+            }
+        }
+
+    async def extract(self, data, type="url"):
+        client = self._http()
+        deadline = time.monotonic() + OCR_RETRY_BUDGET
+
+        for attempt in range(OCR_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.error(f"OCR retry budget of {OCR_RETRY_BUDGET:.0f}s used up after {attempt} attempt(s)")
+                return None
+            timeout = _attempt_timeout(remaining)
+            try:
+                if type == "url":
+                    querystring = {"url": data}
+                    request = client.get(OCR_ENDPOINT, params=querystring, timeout=timeout)
+                else:
+                    payload = {"base64": data}
+                    request = client.post(OCR_ENDPOINT, data=payload, timeout=timeout)
+                # The phase timeouts add up, the budget also caps the attempt as a whole
+                response = await asyncio.wait_for(request, remaining)
+
+                response.raise_for_status()
+
+                if response.text:
+                    response_json = response.json()
+                    print(f"response:", response_json.get("status"))
+                    if response_json.get("status"):
+                        return response_json.get("text")
+                    else:
+                        logging.error(f"OCR API returned an error: {response_json.get('error')}")
+                        return None
+                else:
+                    logging.error("OCR API returned an empty response.")
+                    return None
+
+            except httpx.HTTPError as e:
+                logging.error(f"Error during OCR API request (attempt {attempt + 1}): {e}")
+                backoff = 0.5 * 2 ** attempt
+                if not _retryable(e) or attempt == OCR_RETRIES or time.monotonic() + backoff > deadline:
+                    return None
+                await asyncio.sleep(backoff)
+            except asyncio.TimeoutError:
+                logging.error(f"OCR retry budget of {OCR_RETRY_BUDGET:.0f}s used up during attempt {attempt + 1}")
+                return None
+            except ValueError as e:
+                logging.error(f"Error decoding JSON response: {e}")
+                return None
+        return None
+
+
+def _tesseract_ocr(image_bytes):
+    # Runs in a worker process, must stay a picklable module level function
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return pytesseract.image_to_string(image)
+
+
+class LocalTesseractBackend(OCRBackend):
+    """Tesseract in a process pool sized to the machine, no WAN round trip."""
+
+    name = "tesseract"
+
+    def __init__(self, workers=None):
+        super().__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def available(self):
+        return pytesseract is not None and shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawn, not fork: forking this multi-threaded process can hand the workers held locks
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def extract(self, data, type="url"):
+        if not self.available():
+            logging.error("Local OCR requested but pytesseract/Pillow or the tesseract binary are missing")
+            return None
+        try:
+            if type == "url":
+                response = await self._http().get(data)
+                response.raise_for_status()
+                image_bytes = response.content
+            else:
+                image_bytes = base64.b64decode(data)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(), _tesseract_ocr, image_bytes)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Local OCR failed: {e}")
+            return None
+
+
+def has_address(text):
+    return bool(text) and bool(ca_extractor.extract(text))
+
+
+class OCRRouter:
+    """Picks backends per OCR_POLICY.
+
+    An answer only counts when `accept(text)` holds, a contract address by
+    default: Tesseract reads some text from almost any promo image, so
+    "not empty" says nothing about whether it read the CA right.
+    local-first / remote-first fall back to the other backend when the first
+    answer isn't accepted; race runs both and keeps the first accepted one.
+    With no accepted answer the first non-empty text is returned.
+    """
+
+    def __init__(self, remote, local, policy=OCR_POLICY, accept=has_address):
+        self.remote = remote
+        self.local = local
+        self.policy = policy
+        self.accept = accept
+        if policy != "remote" and not local.available():
+            logging.warning(f"OCR policy '{policy}' needs pytesseract and tesseract, falling back to remote OCR")
+            self.policy = "remote"
+
+    async def extract(self, data, type="url"):
+        if self.policy == "local":
+            return await self.local.extract(data, type)
+        if self.policy == "local-first":
+            return await self._first_accepted((self.local, self.remote), data, type)
+        if self.policy == "remote-first":
+            return await self._first_accepted((self.remote, self.local), data, type)
+        if self.policy == "race":
+            return await self._race(data, type)
+        return await self.remote.extract(data, type)
+
+    @staticmethod
+    def _fallback(text, result):
+        # Keep the first answer with any text in it, in case none is accepted
+        if text and text.strip():
+            return text
+        return result if result is not None else text
+
+    async def _first_accepted(self, backends, data, type):
+        text = None
+        for backend in backends:
+            result = await backend.extract(data, type)
+            if self.accept(result):
+                return result
+            text = self._fallback(text, result)
+        return text
+
+    async def _race(self, data, type):
+        tasks = {asyncio.ensure_future(backend.extract(data, type)): backend
+                 for backend in (self.remote, self.local)}
+        pending = set(tasks)
+        text = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if self.accept(result):
+                        logging.info(f"OCR race won by {tasks[task].name}")
+                        return result
+                    text = self._fallback(text, result)
+            return text
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+ocr_router = OCRRouter(RapidAPIBackend(), LocalTesseractBackend())
+
+
+if __name__ == "__main__":
+    # Offline checks:
+    #   python ocr_backends.py [image]...   the local engine alone
+    #   python ocr_backends.py --remote     RapidAPI retries and budget against a local stand-in server
+    import json
+    import sys
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    async def run_local(paths):
+        backend = LocalTesseractBackend()
+        if not backend.available():
+            print("Local OCR unavailable: install pytesseract, Pillow and the tesseract binary")
+            return
+        if paths:
+            images = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    images.append((path, f.read()))
+        else:
+            from PIL import ImageDraw
+            image = Image.new("L", (900, 120), 255)
+            ImageDraw.Draw(image).text((20, 40), "CA: 7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU", fill=0)
+            output = io.BytesIO()
+            image.save(output, format="PNG")
+            images = [("generated", output.getvalue())]
+        for name, image_bytes in images:
+            started = time.monotonic()
+            text = await backend.extract(base64.b64encode(image_bytes).decode(), type="base64")
+            print(f"{name}: {time.monotonic() - started:.2f}s, {text!r}")
+
+    # Each scenario is the list of (status, delay) the stand-in answers with, in order
+    scenarios = {
+        "ok": [(200, 0)],
+        "5xx then ok": [(503, 0), (200, 0)],
+        "429 every time": [(429, 0)] * 3,
+        "400 is not retried": [(400, 0)],
+        "slower than the budget": [(200, 3.0)] * 3,
+        "slow 5xx then ok": [(503, 0.8), (200, 0.8), (200, 0)],
+    }
+    replies = []
+    calls = []
+
+    class StandInOCR(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            status, delay = replies.pop(0) if replies else (500, 0)
+            time.sleep(delay)
+            data = json.dumps({"status": status == 200, "text": "CA: 7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"}).encode()
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except OSError:
+                pass  # the client already timed out and hung up
+
+        def log_message(self, *args):
+            pass
+
+    async def run_remote():
+        # The real OCR_TIMEOUT (10s read) is kept, only the budget is lowered
+        global OCR_ENDPOINT, OCR_RETRY_BUDGET
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInOCR)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        OCR_ENDPOINT = f"http://127.0.0.1:{server.server_port}/ocr"
+        OCR_RETRY_BUDGET = 2.0
+        backend = RapidAPIBackend()
+        for name, script in scenarios.items():
+            replies[:] = list(script)
+            calls.clear()
+            started = time.monotonic()
+            text = await backend.extract("https://pbs.twimg.com/media/test.jpg")
+            print(f"{name}: {'text' if text else 'no text'} after {len(calls)} call(s), "
+                  f"{time.monotonic() - started:.2f}s (budget {OCR_RETRY_BUDGET:.0f}s)")
+        server.shutdown()
+
+    if "--remote" in sys.argv:
+        asyncio.run(run_remote())
+    else:
+        asyncio.run(run_local(sys.argv[1:]))
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+
+def cache_key(data, type="url"):
+    """Media URLs are keyed as-is, uploaded images by a hash of their content."""
+    if type == "url":
+        return f"url:{data}"
+    if isinstance(data, str):
+        data = data.encode()
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+class OCRCache:
+    """OCR results by media URL or image hash.
+
+    An in-memory LRU sits in front of an optional SQLite file so results
+    survive restarts. Entries expire after `ttl` seconds in both tiers.
+    The disk tier never runs on the caller's event loop: lookups go through
+    asyncio.to_thread and writes to a single writer thread.
+    """
+
+    def __init__(self, max_entries=512, ttl=24 * 60 * 60, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writer = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, text TEXT, stored_at REAL)"
+                )
+                self._db.commit()
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-cache-writer")
+            except sqlite3.Error as e:
+                logging.error(f"OCR disk cache disabled, could not open {path}: {e}")
+                self._db = None
+
+    async def get(self, key):
+        """Cached text for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                text, stored_at = entry
+                if now - stored_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    metrics.incr("ocr_cache_hits_memory")
+                    return text
+                del self._memory[key]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._read, key)
+            if row and now - row[1] < self.ttl:
+                with self._lock:
+                    self._remember(key, row[0], row[1])
+                metrics.incr("ocr_cache_hits_disk")
+                return row[0]
+
+        metrics.incr("ocr_cache_misses")
+        return None
+
+    def put(self, key, text):
+        if text is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+        if self._writer is not None:
+            # Only queued here, the commit and its fsync happen on the writer thread
+            self._writer.submit(self._write, key, text, now)
+
+    def _read(self, key):
+        try:
+            with self._db_lock:
+                return self._db.execute("SELECT text, stored_at FROM ocr WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to read OCR result from disk cache: {e}")
+            return None
+
+    def _write(self, key, text, stored_at):
+        try:
+            with self._db_lock:
+                self._db.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?)", (key, text, stored_at))
+                self._db.execute("DELETE FROM ocr WHERE stored_at < ?", (stored_at - self.ttl,))
+                self._db.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write OCR result to disk cache: {e}")
+
+    def _remember(self, key, text, stored_at):
+        self._memory[key] = (text, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+ocr_cache = OCRCache(
+    max_entries=int(os.getenv("OCR_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("OCR_CACHE_TTL", 24 * 60 * 60)),
+    path=os.getenv("OCR_CACHE_PATH") or None,
+)
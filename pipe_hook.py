@@ -0,0 +1,45 @@
+import errno
+import json
+import logging
+import os
+import threading
+
+# Sample action hook: {"hook": "pipe_hook:NamedPipeHook", "options": {"path": "/tmp/ca_hook.fifo"}}
+ACTION_PIPE = os.getenv("ACTION_PIPE", "/tmp/ca_hook.fifo")
+
+
+class NamedPipeHook:
+    """Writes each CA event as a JSON line to a named pipe.
+
+    A local trading process reads the other end, so nothing leaves the
+    machine. With no reader attached events are dropped rather than
+    blocking the hook thread.
+    """
+
+    def __init__(self, path=ACTION_PIPE):
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            os.mkfifo(path)
+
+    def _open(self):
+        if self._fd is None:
+            # Non-blocking open fails right away instead of waiting for a reader
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            os.set_blocking(self._fd, True)
+        return self._fd
+
+    def on_contract(self, event):
+        line = (json.dumps(event.as_dict()) + "\n").encode()
+        with self._lock:
+            try:
+                os.write(self._open(), line)
+            except OSError as e:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                if e.errno in (errno.ENXIO, errno.EPIPE):
+                    logging.warning(f"No reader on {self.path}, dropped event for {event.address}")
+                    return
+                raise
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import random
+import time
+
+import metrics
+
+
+class FixedRateTimer:
+    """Fires polls on a planned monotonic timeline.
+
+    Ticks are anchored to the schedule rather than to the end of the previous
+    poll, so time spent fetching and in the callback does not push the next
+    poll back. Jitter is added per tick and never accumulates.
+    """
+
+    def __init__(self, interval, max_jitter=0.3, report_every=100, name="poller"):
+        self.interval = interval
+        self.name = name
+        self.max_jitter = max_jitter
+        self.report_every = report_every
+        self.first_at = None
+        self.last_fired = None
+        self.next_at = None
+        self.ticks = 0
+        self.missed = 0
+
+    def start(self, delay=0.0):
+        """Anchor the timeline so the first wait() returns after `delay` seconds."""
+        self.first_at = time.monotonic() + delay
+        self.next_at = self.first_at - self.interval
+
+    def set_interval(self, interval):
+        """Change the period from the next tick on, keeping the current anchor."""
+        self.interval = interval
+
+    async def wait(self):
+        if self.next_at is None:
+            self.start(self.interval)
+        self.next_at += self.interval
+        now = time.monotonic()
+
+        # A poll overran whole periods: skip those slots instead of firing a burst
+        if now > self.next_at + self.interval:
+            behind = int((now - self.next_at) // self.interval)
+            self.missed += behind
+            self.next_at += behind * self.interval
+            metrics.incr("polls_missed", behind)
+
+        jitter = random.uniform(0, self.max_jitter)
+        await asyncio.sleep(max(0.0, self.next_at - time.monotonic() + jitter))
+        self.ticks += 1
+        self.last_fired = time.monotonic()
+        metrics.set_gauge(f"{self.name}_rate_planned_per_min", self.planned_rate())
+        metrics.set_gauge(f"{self.name}_rate_achieved_per_min", self.achieved_rate())
+        if self.ticks % self.report_every == 0:
+            self.report()
+
+    def planned_rate(self):
+        """Polls per minute the schedule asked for so far."""
+        if self.ticks + self.missed < 2:
+            return 0.0
+        return (self.ticks + self.missed - 1) / (self.next_at - self.first_at) * 60
+
+    def achieved_rate(self):
+        """Polls per minute actually fired since the first tick."""
+        if self.ticks < 2:
+            return 0.0
+        return (self.ticks - 1) / (self.last_fired - self.first_at) * 60
+
+    def report(self):
+        planned, achieved = self.planned_rate(), self.achieved_rate()
+        logging.info(f"{self.name} rate: achieved {achieved:.2f}/min vs planned {planned:.2f}/min "
+                     f"({self.missed} slots missed over {self.ticks} polls)")
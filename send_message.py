@@ -2,11 +2,13 @@ from telethon import TelegramClient
 import os
 from dotenv import load_dotenv
 import asyncio
+import concurrent.futures
 import threading
 from telethon.sessions import StringSession
 import time
 from pymongo import MongoClient
 from telethon.errors import SessionPasswordNeededError
+import metrics
 
 load_dotenv()
 
@@ -17,6 +19,12 @@ db_name = os.getenv('DATABASE_NAME')
 db = mongo_client[db_name]  
 config_collection = db['configs']
 
+# Seconds to wait for the user to send a login code or 2FA password,
+# kept below the 90s _setup_client waits for the whole login
+AUTH_TIMEOUT = float(os.getenv('TELEGRAM_AUTH_TIMEOUT', 80))
+# Messages in flight on the connection at once, 1 keeps strict delivery order
+SEND_CONCURRENCY = int(os.getenv('TELETHON_SEND_CONCURRENCY', 4))
+
 class TelegramConnection:
     _instance = None
     _lock = threading.Lock()
@@ -37,6 +45,12 @@ class TelegramConnection:
             self.initialized = False
             self.bot_auth_callback = None
             self._connection_event = threading.Event()
+            # Outgoing messages, drained by a sender task on the client loop
+            self._send_queue = None
+            self._send_loop = None
+            self._send_tasks = set()
+            # Pending code/password requests, completed by set_auth_data
+            self._auth_futures = {}
             # Get credentials from MongoDB
             self.creds = config_collection.find_one({'type': 'telegram_creds'}) or {}
             self.api_id = self.creds.get('api_id')
@@ -95,37 +109,59 @@ class TelegramConnection:
             # Reset connection state
             self._connection_event.clear()
             self._auth_data = {'code': None, 'password': None, 'waiting_for': None}
+            self._cancel_auth()
             self._setup_client()
 
     def set_auth_data(self, auth_type, value):
+        """Hand a code or password to the waiting login, from any thread."""
         self._auth_data[auth_type] = value
         self._auth_data['waiting_for'] = None
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._resolve_auth, auth_type)
 
-    def code_callback(self):
-        self._auth_data['waiting_for'] = 'code'
-        if self.bot_auth_callback:
-            self.bot_auth_callback("Please send the Telegram verification code.")
-        
-        # Wait for code to be set
-        while self._auth_data['code'] is None:
-            time.sleep(1)
-        
-        code = self._auth_data['code']
-        self._auth_data['code'] = None
-        return code
+    def _resolve_auth(self, auth_type):
+        future = self._auth_futures.get(auth_type)
+        value = self._auth_data.get(auth_type)
+        if future and not future.done() and value is not None:
+            self._auth_data[auth_type] = None
+            future.set_result(value)
+
+    def _cancel_auth(self):
+        # Fail a login still waiting from a previous attempt so it cleans up after itself
+        for future in list(self._auth_futures.values()):
+            if self.loop and self.loop.is_running():
+                self.loop.call_soon_threadsafe(self._abort_auth, future)
+        self._auth_futures = {}
+
+    @staticmethod
+    def _abort_auth(future):
+        if not future.done():
+            future.set_exception(ConnectionAbortedError("Login restarted"))
 
-    def password_callback(self):
-        self._auth_data['waiting_for'] = 'password'
+    async def _wait_for_auth(self, auth_type, prompt):
+        # Awaited on the client loop, which keeps running while the user types
+        future = self.loop.create_future()
+        self._auth_futures[auth_type] = future
+        self._auth_data['waiting_for'] = auth_type
         if self.bot_auth_callback:
-            self.bot_auth_callback("Please send your 2FA password.")
-        
-        # Wait for password to be set
-        while self._auth_data['password'] is None:
-            time.sleep(1)
-        
-        password = self._auth_data['password']
-        self._auth_data['password'] = None
-        return password
+            self.bot_auth_callback(prompt)
+        # The value may have arrived before we started waiting
+        self._resolve_auth(auth_type)
+        try:
+            return await asyncio.wait_for(future, AUTH_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for the {auth_type} after {AUTH_TIMEOUT:.0f}s")
+        finally:
+            if self._auth_futures.get(auth_type) is future:
+                del self._auth_futures[auth_type]
+            if self._auth_data['waiting_for'] == auth_type:
+                self._auth_data['waiting_for'] = None
+
+    async def code_callback(self):
+        return await self._wait_for_auth('code', "Please send the Telegram verification code.")
+
+    async def password_callback(self):
+        return await self._wait_for_auth('password', "Please send your 2FA password.")
 
     def get_waiting_for(self):
         return self._auth_data['waiting_for']
@@ -151,14 +187,14 @@ class TelegramConnection:
                     self.bot_auth_callback("You need to authenticate. Sending verification code to your phone...")
                 
                 sent_code = await self.client.send_code_request(self.phone_number)
-                code = self.code_callback()
+                code = await self.code_callback()
                 print(f"Got code, signing in...")
                 
                 try:
                     await self.client.sign_in(self.phone_number, code)
                 except SessionPasswordNeededError:
                     print("2FA enabled, requesting password...")
-                    password = self.password_callback()
+                    password = await self.password_callback()
                     try:
                         await self.client.sign_in(password=password)
                     except Exception as e:
@@ -287,26 +323,70 @@ class TelegramConnection:
                 self._connection_event.clear()
                 raise
 
-    def send_message(self, username, message):
-        
+    def submit(self, username, message):
+        """Queue a message on the client loop without waiting for it.
+
+        Returns a concurrent.futures.Future that resolves once Telegram has
+        accepted the message. While connected it never blocks. When the
+        client is down, other threads reconnect first (initialize() may wait
+        up to 90s); on the client loop itself that wait would deadlock, so
+        it raises ConnectionError instead.
+        """
+        if not self.is_connected():
+            if self.loop is not None and asyncio._get_running_loop() is self.loop:
+                raise ConnectionError("Telegram client is disconnected, can't reconnect from its own loop")
+            print("Client not connected, attempting to reconnect...")
+            self.initialize()
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self._enqueue, username, message, time.monotonic(), future)
+        return future
+
+    def _enqueue(self, username, message, queued_at, future):
+        # The loop is replaced on every reconnect, start a sender on the current one
+        if self._send_queue is None or self._send_loop is not self.loop:
+            self._send_queue = asyncio.Queue()
+            self._send_loop = self.loop
+            self.loop.create_task(self._sender(self._send_queue))
+        self._send_queue.put_nowait((username, message, queued_at, future))
+
+    async def _sender(self, queue):
+        slots = asyncio.Semaphore(SEND_CONCURRENCY)
+        while True:
+            item = await queue.get()
+            await slots.acquire()
+            # Each message starts as soon as a slot is free, in queue order, so
+            # Telethon pipelines them on the one connection without waiting on others
+            task = self.loop.create_task(self._send_queued(*item))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _send_queued(self, username, message, queued_at, future):
+        if not future.set_running_or_notify_cancel():
+            return
         try:
-            if not self.is_connected():
-                print("Client not connected, attempting to reconnect...")
-                self.initialize()
-            
-            async def _send():
-                try:
-                    await self.client.send_message(username, message)
-                    return True
-                except Exception as e:
-                    print(f"Error sending message: {e}")
-                    return False
+            await self.client.send_message(username, message)
+        except Exception as e:
+            metrics.incr("telethon_send_errors")
+            future.set_exception(e)
+            return
+        metrics.observe("telethon_send_latency", time.monotonic() - queued_at)
+        future.set_result(True)
 
-            future = asyncio.run_coroutine_threadsafe(_send(), self.loop)
-            return future.result(timeout=10)
+    def send_message(self, username, message):
+        try:
+            future = self.submit(username, message)
         except Exception as e:
             print(f"Error in send_message: {e}")
             raise
+        try:
+            return future.result(timeout=10)
+        except concurrent.futures.TimeoutError:
+            print("Timed out waiting for the message to be sent")
+            raise
+        except Exception as e:
+            print(f"Error sending message: {e}")
+            return False
 
     def disconnect(self):
         """Explicitly disconnect the client"""
@@ -352,16 +432,43 @@ def get_telegram_connection(initialize=False):
             raise
     return _telegram_connection
 
+# Bot username from config, cached until change_config('bot', ...) updates it
+_bot_username = None
+
+def get_bot_username():
+    global _bot_username
+    if _bot_username is None:
+        config = config_collection.find_one() or {}
+        _bot_username = config.get("bot", "fiinnessey")
+    return _bot_username
+
+def invalidate_bot_username():
+    global _bot_username
+    _bot_username = None
+
+def _log_send_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error sending message: {future.exception()}")
+
+def send_message_to_bot_nowait(your_message: str):
+    """Fire-and-forget send for sync callers, returns a concurrent.futures.Future."""
+    connection = get_telegram_connection(initialize=True)
+    future = connection.submit(get_bot_username(), your_message)
+    future.add_done_callback(_log_send_failure)
+    return future
+
+async def send_message_to_bot_async(your_message: str) -> None:
+    """Send without blocking the caller's event loop."""
+    connection = get_telegram_connection()
+    if not connection.is_connected():
+        # Connecting may wait on a login, keep that off the loop
+        await asyncio.to_thread(connection.initialize)
+    await asyncio.wrap_future(connection.submit(get_bot_username(), your_message))
+
 def send_message_to_bot(your_message: str = "Hello ") -> None:
     try:
-        # Get bot username from config
-        config = config_collection.find_one() or {}
-        bot_username = config.get("bot", "fiinnessey")
-        
+        bot_username = get_bot_username()
         connection = get_telegram_connection(initialize=True)
-        if not connection.is_connected():
-            connection.initialize()
-            
         connection.send_message(bot_username, your_message)
         print(f"Message sent successfully to {bot_username}")
     except Exception as e:
@@ -369,7 +476,61 @@ def send_message_to_bot(your_message: str = "Hello ") -> None:
         raise
 
 if __name__ == "__main__":
-    print("This module should be imported, not run directly.")
+    # Per-send latency of the old blocking path vs the pipelined sender, over a
+    # stand-in client with a fixed round trip and messages arriving at a steady rate:
+    # python send_message.py [messages] [rtt_ms] [interval_ms]
+    import sys
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 80) / 1000
+    interval = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    class StandInClient:
+        def is_connected(self):
+            return True
+
+        async def send_message(self, username, message):
+            await asyncio.sleep(rtt)
+
+    connection = object.__new__(TelegramConnection)
+    connection.client = StandInClient()
+    connection.initialized = True
+    connection._send_queue = None
+    connection._send_loop = None
+    connection._send_tasks = set()
+    connection.loop = asyncio.new_event_loop()
+    threading.Thread(target=connection.loop.run_forever, daemon=True).start()
+
+    def report(label, latencies):
+        latencies = sorted(latencies)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{label} arrival->sent p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms")
 
+    # The removed path: the caller blocks on one run_coroutine_threadsafe(...).result()
+    # per message, so a message arriving mid-send waits for the caller to get free
+    started = time.monotonic()
+    latencies = []
+    for i in range(total):
+        arrival = started + i * interval
+        time.sleep(max(0, arrival - time.monotonic()))
+        asyncio.run_coroutine_threadsafe(connection.client.send_message("bot", f"m{i}"), connection.loop).result(timeout=10)
+        latencies.append(time.monotonic() - arrival)
+    blocking = latencies
 
+    started = time.monotonic()
+    latencies = []
+    futures = []
+    for i in range(total):
+        arrival = started + i * interval
+        time.sleep(max(0, arrival - time.monotonic()))
+        future = connection.submit("bot", f"m{i}")
+        future.add_done_callback(lambda _, arrival=arrival: latencies.append(time.monotonic() - arrival))
+        futures.append(future)
+    for future in futures:
+        future.result(timeout=10)
 
+    print(f"{total} sends, one every {interval * 1000:.0f}ms, {rtt * 1000:.0f}ms round trip, "
+          f"concurrency {SEND_CONCURRENCY} (Mongo lookup of the old path not included)")
+    report("blocking per call:", blocking)
+    report("pipelined submit: ", latencies)
@@ -8,6 +8,11 @@ import telebot
 from dotenv import load_dotenv
 from get_ca import get_contract, get_contract_address, get_text
 import base64
+from image_prep import prepare_image
+from alert_dedup import alert_dedup
+from alert_fanout import build_fanout
+from action_hooks import action_hooks
+from known_addresses import known_addresses
 
 # Configure logging
 logging.basicConfig(
@@ -65,6 +70,10 @@ async def main(TARGET, CHECK_INTERVAL, user_id):
         # Get bot username from config
         config = config_collection.find_one() or {}
         bot_username = config.get("bot", "fiinnessey")
+        fanout = build_fanout(user_id)
+        action_hooks.load_from_config()
+        # Load now, not on the first lookup while a CA is waiting to be alerted
+        known_addresses.reload()
         
         try:
             @client.on(events.NewMessage(chats=TARGET))
@@ -78,11 +87,13 @@ async def main(TARGET, CHECK_INTERVAL, user_id):
                     # Check if the message contains text
                     if message.text:
                         logger.info(f"Message content: {message.text[:100]}...")
-                        contract_addresses = get_contract_address(message.text)
+                        contract_addresses = alert_dedup.first_fresh(get_contract_address(message.text))
                         if contract_addresses:
                             # only send the first contract address
                             # await client.send_message(bot_username, contract_addresses[0])
-                            bot.send_message(user_id,f"{contract_addresses[0]}")
+                            action_hooks.emit(contract_addresses[0], source=f"telegram:{message.id}",
+                                              posted_at=message.date.timestamp())
+                            fanout.publish(contract_addresses[0], source=f"telegram:{message.id}")
                             logger.info(f"Contract address forwarded from {TARGET}: {contract_addresses[0]}")
                     
                     # Check if the message contains media (photo)
@@ -93,21 +104,26 @@ async def main(TARGET, CHECK_INTERVAL, user_id):
                             # Download the photo to memory
                             photo_data = await client.download_media(photo, file=bytes)
                             
+                            # Shrink to an OCR-friendly grayscale JPEG before the upload
+                            photo_data = await asyncio.to_thread(prepare_image, photo_data)
+
                             # Encode the photo data to base64
                             base64_photo = base64.b64encode(photo_data).decode('utf-8')
                             
                             # Extract text from the photo using get_text
-                            text = get_text(base64_photo, type="base64")
+                            text = await get_text(base64_photo, type="base64")
 
                             if text:
-                                contract_addresses = get_contract_address(text)
+                                contract_addresses = alert_dedup.fresh(get_contract_address(text))
                                 if contract_addresses:
                                     for contract_address in contract_addresses:
                                         # await client.send_message(bot_username, contract_address)
-                                        bot.send_message(user_id,f"{contract_address}")
+                                        action_hooks.emit(contract_address, source=f"telegram:{message.id}",
+                                                          posted_at=message.date.timestamp())
+                                        fanout.publish(contract_address, source=f"telegram:{message.id}")
                                         logger.info(f"Contract address forwarded from {TARGET}: {contract_address}")
                                 else:
-                                    logger.info("No contract addresses found in the image.")
+                                    logger.info("No new contract addresses found in the image.")
                             else:
                                 logger.error("Failed to extract text from the image.")
                         else:
@@ -0,0 +1,104 @@
+import time
+from array import array
+
+# How many recent tweet IDs we remember, far more than a timeline page holds
+RING_SIZE = 512
+
+# Snowflake IDs carry milliseconds since this epoch in their top 42 bits
+TWITTER_EPOCH_MS = 1288834974657
+
+
+def snowflake_time(tweet_id):
+    """Creation time of a tweet, as epoch seconds, decoded from its ID."""
+    return ((int(tweet_id) >> 22) + TWITTER_EPOCH_MS) / 1000
+
+
+def tweet_age(tweet_id, now=None):
+    """Seconds since the tweet was created."""
+    now = time.time() if now is None else now
+    return now - snowflake_time(tweet_id)
+
+
+class NewTweetDetector:
+    """Tells which timeline entries have not been seen before.
+
+    Tweet IDs are snowflakes, so they grow with time. We keep a fixed-size
+    ring of recently seen IDs (plain 64-bit ints) and a floor below which
+    everything counts as old. An entry is new when its ID is above the floor
+    and not in the ring, which handles out-of-order entries without keeping
+    whole result pages alive.
+
+    Shared by every poller, so a page that arrives late never re-reports a
+    tweet another poller already handled. The first page only primes the
+    detector.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.ring = array('Q', bytes(8 * size))
+        self.position = 0
+        self.seen = set()
+        self.high_water = 0
+        self.floor = None
+
+    def _remember(self, tweet_id):
+        evicted = self.ring[self.position]
+        if evicted:
+            # Once an ID leaves the ring we can no longer vouch for anything at or below it
+            self.seen.discard(evicted)
+            self.floor = max(self.floor, evicted)
+        self.ring[self.position] = tweet_id
+        self.position = (self.position + 1) % self.size
+        self.seen.add(tweet_id)
+        if tweet_id > self.high_water:
+            self.high_water = tweet_id
+
+    def new_items(self, tweets):
+        ids = [int(tweet.id) for tweet in tweets]
+        # A pinned tweet sits on top of the page but is older than the entry below it
+        pinned = len(ids) > 1 and ids[0] < ids[1]
+
+        if self.floor is None:
+            timeline_ids = ids[1:] if pinned else ids
+            self.floor = min(timeline_ids) if timeline_ids else 0
+            for tweet_id in ids:
+                if tweet_id not in self.seen:
+                    self._remember(tweet_id)
+            return []
+
+        fresh = []
+        for tweet, tweet_id in zip(tweets, ids):
+            if tweet_id > self.high_water or (tweet_id > self.floor and tweet_id not in self.seen):
+                self._remember(tweet_id)
+                fresh.append(tweet)
+        return fresh
+
+
+if __name__ == "__main__":
+    # Micro-benchmark against the old list diff over whole Tweet objects
+    import timeit
+
+    class FakeTweet:
+        def __init__(self, tweet_id):
+            self.id = str(tweet_id)
+
+        def __eq__(self, other):
+            return isinstance(other, FakeTweet) and self.id == other.id
+
+    base = 1_870_000_000_000_000_000
+    pages = [[FakeTweet(base + (n - i) * 4096) for i in range(20)] for n in range(20, 1020)]
+
+    def list_diff():
+        before = pages[0]
+        for page in pages[1:]:
+            [item for item in page if item not in before]
+            before = page
+
+    def detector_diff():
+        detector = NewTweetDetector()
+        for page in pages:
+            detector.new_items(page)
+
+    for name, func in (("list diff", list_diff), ("high-water + ring", detector_diff)):
+        seconds = min(timeit.repeat(func, number=5, repeat=3)) / 5
+        print(f"{name:>18}: {seconds / len(pages) * 1e6:.1f}us per page")
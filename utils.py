@@ -4,7 +4,7 @@ import os
 from twikit import Client, Tweet
 import threading
 from get_client import get_or_create_client  
-from send_message import send_message_to_bot
+from send_message import send_message_to_bot, invalidate_bot_username
 import json
 import logging
 import random
@@ -139,5 +139,7 @@ def change_config(key, value):
         {'$set': {key: value}},
         upsert=True
     )
+    if key == 'bot':
+        invalidate_bot_username()
     logging.info("Configuration updated successfully")
     return "Config updated!"